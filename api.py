@@ -0,0 +1,211 @@
+"""AI ENT Doctor Assistant - HTTP API
+
+Stateless ASGI API over the service layer. Workers keep no per-user
+state, so any number of them can run behind a load balancer; the
+Streamlit app is one client among others.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints:
+    GET  /health
+    GET  /metrics   per-stage latency histograms and error counters (Prometheus text)
+    POST /detect    multipart field ``image`` (or a raw image body) -> predictions
+    POST /analyze   {"predictions": [...], "patient_age": 34} -> analysis + chart data
+    POST /chat      {"medical_context": {...}, "question": "...", "history": [...]} -> reply
+    POST /report    {"report_data": {...}, "image": "<base64 JPEG/PNG>"} -> application/pdf
+"""
+import base64
+import binascii
+import io
+import logging
+import time
+
+from PIL import UnidentifiedImageError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from services.errors import (
+    ServiceError,
+    CONFIG_ERROR,
+    INVALID_INPUT,
+    DETECTION_FAILED,
+    ANALYSIS_FAILED,
+    CHAT_UNAVAILABLE,
+    REPORT_FAILED,
+)
+from services.detection_service import run_detection, build_medical_context, upload_key
+from services.analysis_service import analyze_detection
+from services.chatbot_service import answer_question
+from services.report_service import generate_pdf_bytes
+from utils.image_utils import load_image, process_detection_image, encode_image_base64
+from utils.metrics import prometheus_text, PROMETHEUS_CONTENT_TYPE
+
+logger = logging.getLogger("api")
+
+ERROR_STATUS = {
+    INVALID_INPUT: 400,
+    REPORT_FAILED: 422,
+    DETECTION_FAILED: 502,
+    ANALYSIS_FAILED: 502,
+    CHAT_UNAVAILABLE: 502,
+    CONFIG_ERROR: 503,
+}
+
+
+# ---- Request Helpers ----
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ServiceError(INVALID_INPUT, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ServiceError(INVALID_INPUT, "Request body must be a JSON object")
+    return body
+
+
+def _decode_image(data):
+    if not data:
+        raise ServiceError(INVALID_INPUT, "No image data received")
+    try:
+        return load_image(io.BytesIO(data))
+    except (UnidentifiedImageError, OSError):
+        raise ServiceError(INVALID_INPUT, "Could not decode the image")
+
+
+def _decode_base64_image(value):
+    try:
+        return _decode_image(base64.b64decode(value, validate=True))
+    except (binascii.Error, ValueError):
+        raise ServiceError(INVALID_INPUT, "'image' must be base64-encoded")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _predictions(body):
+    predictions = body.get("predictions")
+    if not isinstance(predictions, list) or not predictions:
+        raise ServiceError(INVALID_INPUT, "'predictions' must be a non-empty list")
+    if not all(
+        isinstance(p, dict) and isinstance(p.get("class"), str) and _is_number(p.get("confidence"))
+        for p in predictions
+    ):
+        raise ServiceError(INVALID_INPUT, "each prediction needs a string 'class' and a numeric 'confidence'")
+    return predictions
+
+
+def _medical_context(body):
+    context = body.get("medical_context") or {}
+    if not isinstance(context, dict):
+        raise ServiceError(INVALID_INPUT, "'medical_context' must be an object")
+    if "confidence" in context and not _is_number(context["confidence"]):
+        raise ServiceError(INVALID_INPUT, "'medical_context.confidence' must be a number")
+    features = context.get("visual_features", [])
+    if not isinstance(features, list) or not all(isinstance(f, str) for f in features):
+        raise ServiceError(INVALID_INPUT, "'medical_context.visual_features' must be a list of strings")
+    return context
+
+
+# ---- Endpoints ----
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(request):
+    return Response(prometheus_text(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+async def detect(request):
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise ServiceError(INVALID_INPUT, "multipart field 'image' is required")
+        data = await upload.read()
+    else:
+        data = await request.body()
+
+    image = _decode_image(data)
+    patient_age = request.query_params.get("age")
+
+    started = time.perf_counter()
+    predictions = await run_in_threadpool(run_detection, image, image_key=upload_key(data))
+    result = {
+        "predictions": predictions,
+        "medical_context": build_medical_context(predictions, patient_age),
+        "latency": time.perf_counter() - started,
+    }
+
+    # Optional annotated copy for clients that want to show or report it
+    if predictions and request.query_params.get("annotated") in ("1", "true"):
+        annotated = await run_in_threadpool(process_detection_image, image, predictions)
+        result["annotated_image"] = encode_image_base64(annotated)
+
+    return JSONResponse(result)
+
+
+async def analyze(request):
+    body = await _json_body(request)
+    analysis, chart_data = await run_in_threadpool(
+        analyze_detection, _predictions(body), body.get("patient_age")
+    )
+    if not analysis:
+        raise ServiceError(ANALYSIS_FAILED, "Gemini returned an empty analysis", retryable=True)
+    return JSONResponse({"analysis": analysis, "chart_data": chart_data})
+
+
+async def chat(request):
+    body = await _json_body(request)
+    question = body.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise ServiceError(INVALID_INPUT, "'question' is required")
+    history = body.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict) and m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise ServiceError(INVALID_INPUT, "'history' must be a list of {'role', 'content'} turns with string content")
+
+    reply, cached = await run_in_threadpool(
+        answer_question, _medical_context(body), question, history
+    )
+    return JSONResponse({"reply": reply, "cached": cached})
+
+
+async def report(request):
+    body = await _json_body(request)
+    report_data = body.get("report_data")
+    if not isinstance(report_data, dict):
+        raise ServiceError(INVALID_INPUT, "'report_data' must be an object")
+    image = _decode_base64_image(body["image"]) if body.get("image") else None
+
+    pdf = await run_in_threadpool(generate_pdf_bytes, report_data, image)
+    return Response(pdf, media_type="application/pdf",
+                    headers={"Content-Disposition": 'attachment; filename="ear_infection_report.pdf"'})
+
+
+# ---- Application ----
+
+async def service_error(request, exc):
+    status = ERROR_STATUS.get(exc.code, 500)
+    if status >= 500:
+        logger.warning("%s %s failed: %s", request.method, request.url.path, exc.message)
+    return JSONResponse({"error": exc.to_dict()}, status_code=status)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/detect", detect, methods=["POST"]),
+        Route("/analyze", analyze, methods=["POST"]),
+        Route("/chat", chat, methods=["POST"]),
+        Route("/report", report, methods=["POST"]),
+    ],
+    exception_handlers={ServiceError: service_error},
+)
@@ -2,23 +2,34 @@
 import streamlit as st
 from datetime import datetime
 
-# Import services
-from services.detection_service import run_detection, build_medical_context
-from services.analysis_service import analyze_detection
+# Import services (SDKs such as LangChain, Gemini, Roboflow and reportlab
+# load on first use of the feature that needs them, not at startup)
+from services.detection_service import run_detection_batch, select_primary_result, build_medical_context, upload_key
+from services.pipeline import start_post_detection, boxes_key
+from services.jobs import submit_job, get_job, DONE
+from services.errors import ServiceError
 from services.chatbot_service import (
     initialize_langchain_chatbot, 
     get_medical_context_string,
-    get_chatbot_response
+    get_chatbot_response,
+    stream_chatbot_response,
+    get_cached_reply,
+    cache_reply
 )
-from services.report_service import generate_pdf_report
+
+# Import configuration
+from config.settings import CHAT_STREAMING, JOB_POLL_INTERVAL
 
 # Import UI components
 from ui.styles import get_custom_css
-from ui.visualizations import create_visualizations
+from ui.analysis_view import ANALYSIS_DISPLAY_ORDER, render_analysis, render_partial_analysis
+from ui.rerun_timer import rerun_timer, timed, render_rerun_log
+from ui.metrics_panel import render_metrics_panel
 
 # Import utilities
 from utils.session_utils import initialize_session_state
-from utils.image_utils import process_detection_image
+from utils.image_utils import load_image
+from utils.metrics import start_metrics_server
 
 # Page Config
 st.set_page_config(page_title="AI ENT Doctor Assistant", page_icon="👂", layout="wide")
@@ -29,163 +40,288 @@ st.markdown(get_custom_css(), unsafe_allow_html=True)
 # Initialize session state
 initialize_session_state()
 
+# Prometheus exporter for this process (no-op unless METRICS_PORT is set)
+start_metrics_server()
+
 # Header
 st.markdown("<div class='header'>", unsafe_allow_html=True)
 st.title("👂 AI ENT Doctor Assistant")
 st.markdown("*Hospital-Grade Detection with Expert AI Consultation*")
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Main Layout
-tab1, tab2, tab3 = st.tabs(["🔬 Detection & Analysis", "👨‍⚕️ Consult ENT Doctor", "📋 Generate Report"])
+# ==================== BACKGROUND JOB PANELS ====================
+# Each panel runs as a nested fragment that polls its jobs only while they
+# are running, then triggers one full rerun so the rest of the page catches up.
 
-# ==================== TAB 1: DETECTION ====================
-with tab1:
-    col_left, col_right = st.columns([1, 1], gap="large")
-    
-    with col_left:
-        st.subheader("📸 Image Upload & Detection")
-        
-        patient_age_input = st.number_input("Patient Age (Optional)", min_value=0, max_value=150, value=0, key="age_input")
-        if patient_age_input > 0:
-            st.session_state.patient_age = patient_age_input
-        
-        uploaded_file = st.file_uploader("Upload ear image", type=["jpg", "jpeg", "png"], label_visibility="collapsed")
-        if uploaded_file:
-            from PIL import Image
-            st.session_state.uploaded_image = Image.open(uploaded_file)
+def job_panel(panel, pending, *args):
+    st.fragment(panel, run_every=JOB_POLL_INTERVAL if pending else None)(*args, pending)
+
+
+def detection_results_panel(polling):
+    pipeline = st.session_state.pipeline
+    results = st.session_state.batch_results
+    multi = len(results) > 1
+    for r in results:
+        index = r['index']
+        label = f"Image {index + 1}" if multi else "Detection Result"
+        if r['error']:
+            st.error(f"{label}: detection failed: {r['error']}")
+            continue
+        if not r['predictions']:
+            if multi:
+                st.caption(f"{label}: no findings · {r['latency']:.2f}s")
+            continue
         
-        if st.session_state.uploaded_image:
-            st.image(st.session_state.uploaded_image, caption="Uploaded Image", use_container_width=True)
-            
-            if st.button("🔍 Run Detection", use_container_width=True, type="primary"):
-                with st.spinner("Analyzing image..."):
-                    try:
-                        predictions = run_detection(st.session_state.uploaded_image)
-                        
-                        if predictions and len(predictions) > 0:
-                            st.session_state.processed_image = process_detection_image(
-                                st.session_state.uploaded_image, 
-                                predictions
-                            )
-                            
-                            st.session_state.detected_classes = [p.get('class', 'Unknown') for p in predictions]
-                            st.session_state.predictions = predictions
-                            
-                            # Build medical context
-                            st.session_state.medical_context = build_medical_context(
-                                predictions, 
-                                st.session_state.patient_age
-                            )
-                            
-                            # Initialize chatbot
-                            medical_context_str = get_medical_context_string(st.session_state.medical_context)
-                            st.session_state.chatbot = initialize_langchain_chatbot(medical_context_str)
-                            st.session_state.chat_history = []
-                            
-                            st.session_state.analysis = {}
-                            st.session_state.chart_data = {}
-                        else:
-                            st.warning("No infections detected in the image.")
-                        
-                        st.session_state.detection_done = True
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Detection failed: {str(e)}")
+        if index not in st.session_state.processed_images and pipeline is not None and pipeline.done(boxes_key(index)):
+            image = pipeline.result(boxes_key(index))
+            if image is not None:
+                st.session_state.processed_images[index] = image
+                if index == st.session_state.primary_index:
+                    st.session_state.processed_image = image
         
-        if st.session_state.detection_done and st.session_state.processed_image:
-            st.image(st.session_state.processed_image, caption="Detection Result", use_container_width=True)
+        if index in st.session_state.processed_images:
+            primary_tag = " (primary)" if multi and index == st.session_state.primary_index else ""
+            st.image(st.session_state.processed_images[index],
+                     caption=f"{label}{primary_tag} · {r['latency']:.2f}s", use_container_width=True)
+        elif pipeline is not None and not pipeline.done(boxes_key(index)):
+            st.caption(f"{label}: drawing boxes...")
+        elif pipeline is not None and pipeline.error(boxes_key(index)):
+            st.warning(f"{label}: could not draw boxes ({pipeline.error(boxes_key(index))})")
+            st.image(pipeline.images[index], caption=f"{label} · {r['latency']:.2f}s", use_container_width=True)
+    
+    if polling and not (pipeline is not None and pipeline.pending("boxes:")):
+        st.rerun()
+
+
+def clinical_analysis_panel(confidence, polling):
+    pipeline = st.session_state.pipeline
+    if not st.session_state.analysis and pipeline is not None and pipeline.done('analysis'):
+        analysis, chart_data = pipeline.result('analysis') or ({}, {})
+        if any(analysis.get(section) for section in ANALYSIS_DISPLAY_ORDER):
+            st.session_state.analysis = analysis
+            st.session_state.chart_data = chart_data
+    
+    if st.session_state.analysis:
+        render_analysis(st.session_state.analysis, confidence)
+    elif pipeline is not None and not pipeline.done('analysis'):
+        render_partial_analysis(*pipeline.analysis_progress(), confidence)
+    else:
+        error = pipeline.error('analysis') if pipeline is not None else None
+        st.warning(error or "Clinical insights are unavailable right now. Please run detection again.")
+    
+    if pipeline is not None and pipeline.done():
+        slowest = max(pipeline.timings().values(), default=0.0)
+        st.caption(f"⏱️ Post-detection pipeline: {pipeline.elapsed():.2f}s total · slowest stage {slowest:.2f}s")
+    
+    if polling and pipeline is not None and pipeline.done('analysis'):
+        st.rerun()
 
-    with col_right:
-        st.subheader("📊 Clinical Analysis")
+
+def report_status_panel(polling):
+    job_id = st.session_state.report_job
+    job = get_job(job_id) if job_id else None
+    
+    if job_id and not st.session_state.report_generated:
+        if job is None:
+            st.session_state.report_job = None
+        elif job.status == DONE:
+            st.session_state.pdf_buffer = job.result
+            st.session_state.report_generated = True
+        elif job.finished:
+            st.error(f"Report generation failed: {job.error or job.status}")
+        else:
+            st.caption("⏳ Generating comprehensive medical report...")
+    
+    if polling and (job is None or job.finished):
+        st.rerun()
+    
+    if st.session_state.report_generated and st.session_state.pdf_buffer:
+        st.success("✅ Report generated successfully!")
+        st.download_button(
+            label="📥 Download PDF Report",
+            data=st.session_state.pdf_buffer,
+            file_name=f"ear_infection_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+            type="primary"
+        )
         
-        if st.session_state.detection_done:
-            if st.session_state.detected_classes:
-                # Detection Results
-                st.markdown("### ✅ Detected Conditions")
-                for i, p in enumerate(st.session_state.predictions):
-                    with st.container(border=True):
-                        col1, col2 = st.columns([2, 1])
-                        with col1:
-                            st.write(f"**{p['class']}**")
-                        with col2:
-                            confidence = p['confidence']*100
-                            st.metric("Confidence", f"{confidence:.2f}%")
+        # Report Preview
+        with st.expander("📄 Report Preview", expanded=False):
+            if st.session_state.report_data:
+                rd = st.session_state.report_data
+                st.markdown(f"**Report ID:** {rd['report_id']}")
+                st.markdown(f"**Patient:** {rd['patient']['name']} ({rd['patient']['age']}y, {rd['patient']['gender']})")
+                st.markdown(f"**Date:** {rd['report_date']}")
                 
-                # Generate Analysis
-                if not st.session_state.analysis:
-                    with st.spinner("Generating clinical insights..."):
-                        st.session_state.analysis, st.session_state.chart_data = analyze_detection(
-                            st.session_state.predictions,
-                            st.session_state.patient_age
-                        )
+                st.markdown("**Detected Conditions:**")
+                for inf in rd['detection']['infections']:
+                    st.markdown(f"- {inf['name']} ({inf['confidence']})")
                 
-                # Display Analysis
-                if st.session_state.analysis:
-                    analysis = st.session_state.analysis
-                    
-                    if analysis.get('overview'):
-                        st.markdown("#### 📋 Overview")
-                        st.info(analysis['overview'])
+                if rd.get('doctor_notes') != "None provided":
+                    st.markdown(f"**Doctor's Notes:** {rd['doctor_notes']}")
+
+
+# ==================== TAB 1: DETECTION ====================
+# Each tab section is a fragment: its widgets rerun only that section.
+# Anything that changes what other tabs show (a new detection, a finished
+# background job) triggers a full rerun instead.
+
+@st.fragment
+@timed("detection")
+def detection_section():
+    st.subheader("📸 Image Upload & Detection")
+    
+    patient_age_input = st.number_input("Patient Age (Optional)", min_value=0, max_value=150, value=0, key="age_input")
+    if patient_age_input > 0:
+        st.session_state.patient_age = patient_age_input
+    
+    uploaded_files = st.file_uploader("Upload ear images", type=["jpg", "jpeg", "png"],
+                                      accept_multiple_files=True, label_visibility="collapsed")
+    if uploaded_files:
+        # Decode only when the selection changes, not on every rerun
+        file_ids = [f.file_id for f in uploaded_files]
+        if file_ids != st.session_state.uploaded_file_ids:
+            st.session_state.uploaded_images = [load_image(f) for f in uploaded_files]
+            st.session_state.uploaded_image_keys = [upload_key(f.getvalue()) for f in uploaded_files]
+            st.session_state.uploaded_file_ids = file_ids
+        primary_index = st.session_state.primary_index
+        if primary_index >= len(st.session_state.uploaded_images):
+            primary_index = 0
+        st.session_state.uploaded_image = st.session_state.uploaded_images[primary_index]
+    
+    if st.session_state.uploaded_images:
+        images = st.session_state.uploaded_images
+        if len(images) == 1:
+            st.image(images[0], caption="Uploaded Image", use_container_width=True)
+        else:
+            st.image(images, caption=[f"Image {i + 1}" for i in range(len(images))], width=160)
+        
+        if st.button("🔍 Run Detection", use_container_width=True, type="primary"):
+            with st.spinner(f"Analyzing {len(images)} image(s)..."):
+                try:
+                    results = run_detection_batch(images, image_keys=st.session_state.uploaded_image_keys)
+                    st.session_state.batch_results = results
+                    st.session_state.processed_images = {}
+                    st.session_state.processed_image = None
                     
-                    if analysis.get('severity'):
-                        st.markdown("#### ⚠️ Severity Assessment")
-                        confidence = st.session_state.predictions[0]['confidence'] * 100
-                        if confidence < 60:
-                            st.success(analysis['severity'])
-                        elif confidence < 85:
-                            st.warning(analysis['severity'])
-                        else:
-                            st.error(analysis['severity'])
+                    # Work still queued for a previous detection is no longer needed
+                    if st.session_state.pipeline is not None:
+                        st.session_state.pipeline.cancel()
+                        st.session_state.pipeline = None
                     
-                    # Display Charts
-                    if st.session_state.chart_data:
-                        st.markdown("#### 📈 Visual Analytics")
+                    primary = select_primary_result(results)
+                    if primary:
+                        predictions = primary['predictions']
+                        st.session_state.primary_index = primary['index']
+                        st.session_state.uploaded_image = images[primary['index']]
                         
-                        charts = create_visualizations(st.session_state.chart_data)
+                        st.session_state.detected_classes = [p.get('class', 'Unknown') for p in predictions]
+                        st.session_state.predictions = predictions
                         
-                        if 'confidence' in charts:
-                            st.plotly_chart(charts['confidence'], use_container_width=True, key="conf_chart")
+                        # Build medical context
+                        st.session_state.medical_context = build_medical_context(
+                            predictions, 
+                            st.session_state.patient_age
+                        )
                         
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if 'symptoms' in charts:
-                                st.plotly_chart(charts['symptoms'], use_container_width=True, key="symp_chart")
-                        with col2:
-                            if 'timeline' in charts:
-                                st.plotly_chart(charts['timeline'], use_container_width=True, key="time_chart")
+                        # Chatbot is built on the first chat message for this context
+                        st.session_state.chatbot = None
+                        st.session_state.chat_history = []
+                        st.session_state.report_stamp = None
                         
-                        col3, col4 = st.columns(2)
-                        with col3:
-                            if 'features' in charts:
-                                st.plotly_chart(charts['features'], use_container_width=True, key="feat_chart")
-                        with col4:
-                            if 'prevention' in charts:
-                                st.plotly_chart(charts['prevention'], use_container_width=True, key="prev_chart")
-                    
-                    # Additional sections
-                    if analysis.get('symptoms'):
-                        with st.expander("🩺 Probable Symptoms", expanded=False):
-                            for symptom in analysis['symptoms']:
-                                st.markdown(f"• {symptom}")
-                    
-                    if analysis.get('prevention'):
-                        with st.expander("🛡️ Prevention & Care Guidance", expanded=False):
-                            for prev in analysis['prevention']:
-                                st.markdown(f"• {prev}")
+                        st.session_state.analysis = {}
+                        st.session_state.chart_data = {}
+                        
+                        # Boxes, analysis and chat warm-up run concurrently from here
+                        st.session_state.pipeline = start_post_detection(
+                            images,
+                            results,
+                            predictions,
+                            st.session_state.medical_context,
+                            st.session_state.patient_age
+                        )
+                    elif not any(r['error'] for r in results):
+                        st.warning("No infections detected in the image.")
                     
-                    if analysis.get('red_flags'):
-                        with st.expander("🚨 Red-Flag Alerts", expanded=False):
-                            st.error("Seek immediate medical attention if you experience:")
-                            for flag in analysis['red_flags']:
-                                st.markdown(f"• {flag}")
+                    st.session_state.detection_done = True
+                    st.rerun()
                     
-                    if analysis.get('disclaimer'):
-                        st.markdown("---")
-                        st.caption(analysis['disclaimer'])
+                except Exception as e:
+                    st.error(f"Detection failed: {str(e)}")
+    
+    if st.session_state.detection_done and st.session_state.batch_results:
+        pipeline = st.session_state.pipeline
+        job_panel(detection_results_panel, pipeline is not None and pipeline.pending("boxes:"))
+
+
+@st.fragment
+@timed("analysis")
+def analysis_section():
+    st.subheader("📊 Clinical Analysis")
+    
+    if st.session_state.detection_done:
+        if st.session_state.detected_classes:
+            # Detection Results
+            st.markdown("### ✅ Detected Conditions")
+            for i, p in enumerate(st.session_state.predictions):
+                with st.container(border=True):
+                    col1, col2 = st.columns([2, 1])
+                    with col1:
+                        st.write(f"**{p['class']}**")
+                    with col2:
+                        confidence = p['confidence']*100
+                        st.metric("Confidence", f"{confidence:.2f}%")
+            
+            confidence = st.session_state.predictions[0]['confidence'] * 100
+            
+            # Analysis runs as a background job; sections appear as they complete
+            if not st.session_state.analysis and st.session_state.pipeline is None:
+                st.session_state.pipeline = start_post_detection(
+                    st.session_state.uploaded_images,
+                    st.session_state.batch_results,
+                    st.session_state.predictions,
+                    st.session_state.medical_context,
+                    st.session_state.patient_age
+                )
+            
+            pipeline = st.session_state.pipeline
+            job_panel(
+                clinical_analysis_panel,
+                not st.session_state.analysis and pipeline is not None and not pipeline.done('analysis'),
+                confidence
+            )
+
 
 # ==================== TAB 2: ENT DOCTOR CHAT ====================
-with tab2:
+# Chat turns rerun only this fragment, so the scans, charts and report
+# form are not re-sent on every message. Buttons queue the question from
+# their callback, so the turn is answered (and drawn) in that same run.
+
+def chat_bubble(role, content):
+    if role == 'user':
+        return f"""
+        <div class='user-message chat-message'>
+        <b>You:</b><br>{content}
+        </div>
+        """
+    return f"""
+    <div class='doctor-message chat-message'>
+    <b>Dr. Chen:</b><br>{content}
+    </div>
+    """
+
+
+def queue_question(question=None):
+    """Button callback: queue a quick question, or the typed one"""
+    question = question or st.session_state.user_input
+    if question and st.session_state.pending_user_message is None:
+        st.session_state.pending_user_message = question
+
+
+@st.fragment
+@timed("chat")
+def chat_section():
     st.markdown("<div class='doctor-badge'>👨‍⚕️ Dr. Sarah Chen, ENT Specialist</div>", unsafe_allow_html=True)
     
     if not st.session_state.detection_done:
@@ -215,7 +351,7 @@ with tab2:
         chat_container = st.container(height=500)
         
         with chat_container:
-            if not st.session_state.chat_history:
+            if not st.session_state.chat_history and not st.session_state.pending_user_message:
                 st.markdown("""
                 <div class='doctor-message chat-message'>
                 <b>Dr. Chen:</b><br>
@@ -225,20 +361,9 @@ with tab2:
                 """, unsafe_allow_html=True)
             
             for msg in st.session_state.chat_history:
-                if msg['role'] == 'user':
-                    st.markdown(f"""
-                    <div class='user-message chat-message'>
-                    <b>You:</b><br>{msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class='doctor-message chat-message'>
-                    <b>Dr. Chen:</b><br>{msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
+                st.markdown(chat_bubble(msg['role'], msg['content']), unsafe_allow_html=True)
         
-        # Process pending message
+        # Answer the queued question and draw the turn below the history
         if st.session_state.pending_user_message:
             user_question = st.session_state.pending_user_message
             
@@ -246,38 +371,54 @@ with tab2:
                 'role': 'user',
                 'content': user_question
             })
+            with chat_container:
+                st.markdown(chat_bubble('user', user_question), unsafe_allow_html=True)
+                reply_placeholder = st.empty()
             
-            with st.spinner("Dr. Chen is typing..."):
+            medical_context_str = get_medical_context_string(st.session_state.medical_context)
+            if st.session_state.chatbot is None and st.session_state.pipeline is not None:
+                # Warmed up in the background right after detection
+                st.session_state.chatbot = st.session_state.pipeline.result('chatbot')
+            try:
                 if st.session_state.chatbot is None:
-                    medical_context_str = get_medical_context_string(st.session_state.medical_context)
                     st.session_state.chatbot = initialize_langchain_chatbot(medical_context_str)
-                
-                formatted_response = get_chatbot_response(st.session_state.chatbot, user_question)
             
+                formatted_response = get_cached_reply(st.session_state.chatbot, medical_context_str, user_question)
+                if formatted_response is None:
+                    if CHAT_STREAMING:
+                        # Stream the reply into the open chat window
+                        formatted_response = ""
+                        for formatted_response in stream_chatbot_response(st.session_state.chatbot, user_question):
+                            reply_placeholder.markdown(chat_bubble('assistant', formatted_response),
+                                                       unsafe_allow_html=True)
+                    else:
+                        with st.spinner("Dr. Chen is typing..."):
+                            formatted_response = get_chatbot_response(st.session_state.chatbot, user_question)
+                    cache_reply(st.session_state.chatbot, medical_context_str, user_question, formatted_response)
+            except ServiceError as e:
+                # Shown as Dr. Chen's reply; the turn is not cached
+                formatted_response = e.message
+            
+            reply_placeholder.markdown(chat_bubble('assistant', formatted_response), unsafe_allow_html=True)
             st.session_state.chat_history.append({
                 'role': 'assistant',
                 'content': formatted_response
             })
             
             st.session_state.pending_user_message = None
-            st.rerun()
         
         # Chat Input
         st.markdown("<div class='chat-input-container'>", unsafe_allow_html=True)
         
         col1, col2 = st.columns([5, 1])
         with col1:
-            user_question = st.text_input(
+            st.text_input(
                 "Ask Dr. Chen about your scan results...",
                 key="user_input",
                 placeholder="e.g., What does this infection mean? Is this serious?"
             )
         with col2:
-            send_button = st.button("Send", use_container_width=True, type="primary")
-        
-        if send_button and user_question and st.session_state.pending_user_message is None:
-            st.session_state.pending_user_message = user_question
-            st.rerun()
+            st.button("Send", use_container_width=True, type="primary", on_click=queue_question)
         
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -286,22 +427,23 @@ with tab2:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("What is this condition?", use_container_width=True):
-                st.session_state.pending_user_message = 'Can you explain what this condition means?'
-                st.rerun()
+            st.button("What is this condition?", use_container_width=True, on_click=queue_question,
+                      args=('Can you explain what this condition means?',))
         
         with col2:
-            if st.button("How serious is this?", use_container_width=True):
-                st.session_state.pending_user_message = 'How serious is this infection?'
-                st.rerun()
+            st.button("How serious is this?", use_container_width=True, on_click=queue_question,
+                      args=('How serious is this infection?',))
         
         with col3:
-            if st.button("What should I do next?", use_container_width=True):
-                st.session_state.pending_user_message = 'What are the next steps I should take?'
-                st.rerun()
+            st.button("What should I do next?", use_container_width=True, on_click=queue_question,
+                      args=('What are the next steps I should take?',))
+
 
 # ==================== TAB 3: GENERATE REPORT ====================
-with tab3:
+
+@st.fragment
+@timed("report")
+def report_section():
     st.subheader("📋 Generate Medical Report")
     
     if not st.session_state.detection_done:
@@ -324,58 +466,78 @@ with tab3:
                                     placeholder="Add any additional observations or recommendations...")
         
         if st.button("🔄 Generate PDF Report", use_container_width=True, type="primary"):
-            with st.spinner("Generating comprehensive medical report..."):
-                report_data = {
-                    'report_id': f"RPT-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                    'report_date': datetime.now().strftime("%B %d, %Y at %I:%M %p"),
-                    'patient': {
-                        'id': patient_id,
-                        'name': patient_name,
-                        'age': patient_age_report,
-                        'gender': patient_gender
-                    },
-                    'detection': {
-                        'infections': [
-                            {
-                                'name': p['class'],
-                                'confidence': f"{p['confidence']*100:.2f}%"
-                            }
-                            for p in st.session_state.predictions
-                        ]
-                    },
-                    'analysis': st.session_state.analysis,
-                    'doctor_notes': doctor_notes if doctor_notes else "None provided"
-                }
-                
-                st.session_state.report_data = report_data
-                st.session_state.pdf_buffer = generate_pdf_report(report_data, st.session_state.processed_image)
-                st.session_state.report_generated = True
-                st.success("✅ Report generated successfully!")
-        
-        if st.session_state.report_generated and st.session_state.pdf_buffer:
-            st.download_button(
-                label="📥 Download PDF Report",
-                data=st.session_state.pdf_buffer,
-                file_name=f"ear_infection_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mime="application/pdf",
-                use_container_width=True,
-                type="primary"
-            )
+            from services.report_service import generate_pdf_bytes, report_key
             
-            # Report Preview
-            with st.expander("📄 Report Preview", expanded=False):
-                if st.session_state.report_data:
-                    rd = st.session_state.report_data
-                    st.markdown(f"**Report ID:** {rd['report_id']}")
-                    st.markdown(f"**Patient:** {rd['patient']['name']} ({rd['patient']['age']}y, {rd['patient']['gender']})")
-                    st.markdown(f"**Date:** {rd['report_date']}")
-                    
-                    st.markdown("**Detected Conditions:**")
-                    for inf in rd['detection']['infections']:
-                        st.markdown(f"- {inf['name']} ({inf['confidence']})")
-                    
-                    if rd.get('doctor_notes') != "None provided":
-                        st.markdown(f"**Doctor's Notes:** {rd['doctor_notes']}")
+            # One report ID and date per detection, so repeated clicks produce the same PDF
+            if st.session_state.report_stamp is None:
+                now = datetime.now()
+                st.session_state.report_stamp = (f"RPT-{now.strftime('%Y%m%d%H%M%S')}",
+                                                  now.strftime("%B %d, %Y at %I:%M %p"))
+            report_id, report_date = st.session_state.report_stamp
+            
+            report_data = {
+                'report_id': report_id,
+                'report_date': report_date,
+                'patient': {
+                    'id': patient_id,
+                    'name': patient_name,
+                    'age': patient_age_report,
+                    'gender': patient_gender
+                },
+                'detection': {
+                    'infections': [
+                        {
+                            'name': p['class'],
+                            'confidence': f"{p['confidence']*100:.2f}%"
+                        }
+                        for p in st.session_state.predictions
+                    ]
+                },
+                'analysis': st.session_state.analysis,
+                'doctor_notes': doctor_notes if doctor_notes else "None provided"
+            }
+            
+            # Built in the background; a repeated click with the same data joins the running job.
+            # The scan is keyed by its boxes job rather than by hashing its pixels here.
+            pipeline = st.session_state.pipeline
+            processed_image = st.session_state.processed_image
+            image_key = None
+            if pipeline is not None:
+                image_key = pipeline.job_id(boxes_key(st.session_state.primary_index))
+                if processed_image is None:
+                    processed_image = pipeline.result(boxes_key(st.session_state.primary_index))
+            st.session_state.report_data = report_data
+            st.session_state.report_job = submit_job(
+                "report", generate_pdf_bytes, report_data, processed_image, image_key,
+                key=report_key(report_data, processed_image, image_key)
+            ).id
+            st.session_state.pdf_buffer = None
+            st.session_state.report_generated = False
+        
+        report_job = get_job(st.session_state.report_job) if st.session_state.report_job else None
+        job_panel(report_status_panel, report_job is not None and not report_job.finished)
+
+
+# Main Layout
+with rerun_timer("app"):
+    tab1, tab2, tab3 = st.tabs(["🔬 Detection & Analysis", "👨‍⚕️ Consult ENT Doctor", "📋 Generate Report"])
+    
+    with tab1:
+        col_left, col_right = st.columns([1, 1], gap="large")
+        with col_left:
+            detection_section()
+        with col_right:
+            analysis_section()
+    
+    with tab2:
+        chat_section()
+    
+    with tab3:
+        report_section()
+
+with st.sidebar:
+    render_rerun_log()
+    render_metrics_panel()
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,67 @@
+"""AI ENT Doctor Assistant - Headless Batch Reports
+
+Runs detection, clinical analysis and PDF generation over a directory of
+otoscope images without the Streamlit UI. API keys come from
+``.streamlit/secrets.toml`` or the ROBOFLOW_API_KEY / GEMINI_API_KEY
+environment variables.
+
+    python batch_cli.py IMAGE_DIR --patients patients.csv --output reports/
+
+The patients CSV needs an ``image`` column (file name) and may have
+``patient_id``, ``name``, ``age``, ``gender`` and ``notes``. Re-running
+with the same output directory resumes an interrupted run.
+"""
+import argparse
+import sys
+
+from config.settings import DETECTION_MAX_CONCURRENCY
+from services.batch_service import run_batch, STAGES
+
+
+def print_record(record):
+    if record['status'] == "done":
+        findings = ", ".join(record['findings']) or "no findings"
+        print(f"✓ {record['image']}: {findings}")
+    else:
+        print(f"✗ {record['image']}: {record['error']}", file=sys.stderr)
+
+
+def print_summary(summary):
+    print()
+    print(f"Processed {summary['processed']} · failed {summary['failed']} · "
+          f"skipped {summary['skipped']} (already done)")
+    print(f"Wall time {summary['wall_time']:.1f}s · {summary['images_per_second']:.2f} images/s")
+    print(f"{'stage':<8} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    for stage in STAGES:
+        s = summary['stages'].get(stage)
+        if s:
+            print(f"{stage:<8} {s['count']:>6} {s['mean']:>7.2f}s {s['p50']:>7.2f}s "
+                  f"{s['p95']:>7.2f}s {s['max']:>7.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate PDF reports for a directory of ear images")
+    parser.add_argument("image_dir")
+    parser.add_argument("--patients", help="CSV of patient metadata keyed by the 'image' column")
+    parser.add_argument("--output", default="reports", help="directory for PDFs, checkpoint and summary")
+    parser.add_argument("--concurrency", type=int, default=DETECTION_MAX_CONCURRENCY)
+    parser.add_argument("--no-resume", action="store_true", help="reprocess images already in the checkpoint")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_batch(
+            args.image_dir,
+            args.output,
+            patients_csv=args.patients,
+            concurrency=args.concurrency,
+            resume=not args.no_resume,
+            on_record=print_record
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(summary)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
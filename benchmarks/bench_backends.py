@@ -0,0 +1,73 @@
+"""Benchmark: per-image latency and throughput of the detection backends
+
+Runs ``backend.detect`` directly (detection cache bypassed) on synthetic
+images prepared exactly as ``run_detection`` prepares uploads.
+
+Run from the repository root:
+    python -m benchmarks.bench_backends --backends stub,onnx --onnx-model model.onnx
+The roboflow backend needs ROBOFLOW_API_KEY and network access.
+"""
+import argparse
+import statistics
+import time
+
+from config.settings import DETECTION_MAX_SIDE
+from services.detection_backends import BACKENDS, OnnxRuntimeBackend, get_detection_backend
+from utils.image_utils import prepare_upload_image
+from benchmarks.bench_transport import synthetic_image
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_backend(name, onnx_model):
+    if name == OnnxRuntimeBackend.name:
+        if not onnx_model:
+            return None
+        started = time.perf_counter()
+        backend = OnnxRuntimeBackend(model_path=onnx_model)
+        print(f"onnx: model load {(time.perf_counter() - started) * 1000:.0f} ms (once per process)")
+        return backend
+    return get_detection_backend(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="stub,onnx", help=f"comma list of {', '.join(BACKENDS)}")
+    parser.add_argument("--onnx-model", default="", help="path to an exported ONNX model")
+    parser.add_argument("--size", default="4000x3000")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    image, _ = prepare_upload_image(synthetic_image(width, height), DETECTION_MAX_SIDE)
+    print(f"Input {width}x{height} prepared to {image.width}x{image.height}")
+
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        backend = build_backend(name, args.onnx_model)
+        if backend is None:
+            print(f"{name}: skipped (pass --onnx-model)")
+            continue
+
+        for _ in range(args.warmup):
+            backend.detect(image)
+
+        timings = []
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            backend.detect(image)
+            timings.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+
+        print(f"{name:<9} p50={statistics.median(timings):8.2f} ms  "
+              f"p95={percentile(timings, 95):8.2f} ms  "
+              f"throughput={args.iterations / elapsed:8.1f} img/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: per-rerun cost of the Visual Analytics charts
+
+Every chat message reruns the script, and the five Plotly charts were
+rebuilt each time even though ``chart_data`` had not changed. This
+measures the chart work one rerun does:
+
+* rebuild: figures built from scratch (the previous behaviour)
+* cold: first rerun with new chart data (build + cache the JSON specs)
+* warm: later reruns, which re-inflate the cached specs
+
+Each mode includes the serialization ``st.plotly_chart`` performs. The
+second table times whole ``AppTest`` reruns of ``render_charts`` with the
+same data.
+
+Run from the repository root:
+    python -m benchmarks.bench_charts --iterations 50
+"""
+import argparse
+import statistics
+import time
+
+import plotly.io
+import plotly.tools
+
+from ui import visualizations
+from ui.visualizations import build_figures, create_visualizations, chart_cache_stats
+
+CHART_DATA = {
+    'detection_confidence': {'confidence_percent': 87.5},
+    'symptom_probability_distribution': {'Ear pain': 85, 'Fever': 60, 'Hearing loss': 45, 'Discharge': 30},
+    'infection_progress_timeline': {'Day 1': 3, 'Day 2': 4, 'Day 3': 2},
+    'visual_feature_contribution': {'Redness': 40, 'Bulging': 35, 'Fluid level': 25},
+    'prevention_effectiveness': {'Keep ears dry': 4, 'Vaccination': 3, 'Avoid smoke': 5},
+}
+
+APP_SCRIPT = """
+from benchmarks.bench_charts import CHART_DATA
+from ui.analysis_view import render_charts
+render_charts(CHART_DATA)
+"""
+
+
+def serialize(charts):
+    """What st.plotly_chart does with each figure before sending it"""
+    for fig in charts.values():
+        figure = plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True)
+        plotly.io.to_json(figure, validate=False)
+
+
+def rebuild():
+    serialize(build_figures(CHART_DATA)[0])
+
+
+def cold():
+    visualizations._spec_cache.clear()
+    serialize(create_visualizations(CHART_DATA))
+
+
+def warm():
+    serialize(create_visualizations(CHART_DATA))
+
+
+def measure(fn, iterations):
+    fn()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def measure_reruns(iterations):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(APP_SCRIPT, default_timeout=60)
+    at.run()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'median ms':>10} {'max ms':>8}")
+    for name, fn in (("rebuild", rebuild), ("cold", cold), ("warm", warm)):
+        median, worst = measure(fn, args.iterations)
+        print(f"{name:<8} {median:>10.2f} {worst:>8.2f}")
+    print(f"cache: {chart_cache_stats()}")
+
+    reruns = max(5, args.iterations // 5)
+    warm_rerun = measure_reruns(reruns)
+    visualizations._spec_cache.maxsize = 0
+    visualizations._spec_cache.clear()
+    uncached_rerun = measure_reruns(reruns)
+    print(f"\nAppTest rerun of render_charts, median of {reruns}")
+    print(f"  cache disabled {uncached_rerun:8.1f} ms")
+    print(f"  cache warm     {warm_rerun:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: chatbot construction cost per detection / per session
+
+Compares the old eager path (a new ChatGoogleGenerativeAI, memory, prompt
+and chain on every "Run Detection") with the lazy path (shared LLM from
+the client registry, per-session memory/prompt/chain only on the first
+chat message). Reports construction time and memory retained per session.
+No network calls are made; a placeholder API key is used.
+
+Run from the repository root:
+    python -m benchmarks.bench_chatbot_init --sessions 50
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+import config.api_config as api_config
+from services import chatbot_service
+
+CONTEXT = chatbot_service.get_medical_context_string({
+    'condition': 'Acute Otitis Media',
+    'confidence': 91.7,
+    'age': 34,
+    'visual_features': ['Redness detected', 'Inflammation visible', 'Structural changes']
+})
+
+
+def eager_chatbot():
+    # Pre-registry behaviour: every detection built its own client
+    api_config._clients.pop("chat_llm", None)
+    return chatbot_service.initialize_langchain_chatbot(CONTEXT)
+
+
+def lazy_chatbot():
+    return chatbot_service.initialize_langchain_chatbot(CONTEXT)
+
+
+def measure(name, build, sessions):
+    build()  # warm imports and, for the lazy path, the shared client
+    gc.collect()
+
+    timings = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for _ in range(sessions):
+        started = time.perf_counter()
+        kept.append(build())
+        timings.append((time.perf_counter() - started) * 1000)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"{name:<7} p50={statistics.median(timings):7.2f} ms  "
+          f"max={max(timings):7.2f} ms  retained/session={retained / sessions / 1024:7.1f} KiB")
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    with mock.patch.object(api_config, "get_gemini_api_key", return_value="bench-placeholder-key"):
+        print(f"{args.sessions} sessions")
+        measure("eager", eager_chatbot, args.sessions)
+        api_config._clients.pop("chat_llm", None)
+        measure("lazy", lazy_chatbot, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
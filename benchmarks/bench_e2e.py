@@ -0,0 +1,315 @@
+"""Benchmark: end-to-end detection → analysis → chat → PDF against local fakes
+
+Starts the Roboflow and Gemini stand-ins from ``benchmarks.fake_services``
+and runs complete sessions through the real service layer and SDK
+clients: detection, clinical analysis, box drawing, one chatbot turn and
+the PDF report. No API keys or network access are needed.
+
+Each concurrency level runs ``--sessions`` sessions and reports
+throughput plus p50/p95/p99 per stage and end to end. Results are
+written as JSON; ``--baseline`` compares p95 latency and throughput with
+an earlier results file and exits non-zero on a regression.
+
+Caches are disabled so every session pays for its calls; ``--warm-caches``
+keeps them.
+
+Run from the repository root:
+    python -m benchmarks.bench_e2e --sessions 40 --concurrency 1,8 --output e2e.json
+    python -m benchmarks.bench_e2e --gemini-failure-rate 0.05 --stream --baseline e2e.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image
+
+# Only modules that do not read config.settings may be imported here: the
+# settings are fixed at import time and must see the fake endpoints
+from benchmarks.fake_services import FakeRoboflowServer, FakeGeminiServer, FakeServiceConfig
+
+STAGES = ("detect", "analyze", "boxes", "chat", "report", "end_to_end")
+
+CHAT_QUESTION = "How serious is this and what should I do next?"
+
+# Cache settings forced off unless --warm-caches is given
+NO_CACHE_ENV = {
+    "DETECTION_CACHE_SIZE": "0",
+    "DETECTION_CACHE_DIR": "",
+    "ANALYSIS_CACHE_SIZE": "0",
+    "ANALYSIS_CACHE_DIR": "",
+    "CHAT_CACHE_SIZE": "0",
+    "REPORT_CACHE_SIZE": "0",
+}
+
+
+def configure_environment(roboflow_url, gemini_url, warm_caches):
+    """Point the app's settings at the fakes; must run before services are imported"""
+    os.environ.update({
+        "ROBOFLOW_API_URL": roboflow_url,
+        "ROBOFLOW_API_KEY": "benchmark",
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "GEMINI_TRANSPORT": "rest",
+        "GEMINI_API_KEY": "benchmark",
+        "DETECTION_BACKEND": "roboflow",
+        "DETECTION_TRANSPORT": "memory",
+    })
+    if not warm_caches:
+        os.environ.update(NO_CACHE_ENV)
+
+
+def session_images(count, width, height):
+    """Distinct images (shifted copies) so no two sessions share a cache key"""
+    from benchmarks.bench_transport import synthetic_image
+
+    base = np.asarray(synthetic_image(width, height))
+    return [Image.fromarray(np.roll(base, i * 7, axis=1)) for i in range(count)]
+
+
+def run_session(image, stream):
+    """One patient session; returns stage timings and the failure, if any"""
+    from services.detection_service import run_detection, build_medical_context
+    from services.analysis_service import analyze_detection, stream_analysis
+    from services.chatbot_service import (
+        answer_question,
+        initialize_langchain_chatbot,
+        get_medical_context_string,
+        stream_chatbot_response,
+    )
+    from services.batch_service import build_report_data
+    from services.report_service import generate_pdf_bytes
+    from utils.image_utils import process_detection_image
+
+    timings = {}
+    stage = None
+
+    def timed(name, fn, *args):
+        nonlocal stage
+        stage = name
+        started = time.perf_counter()
+        result = fn(*args)
+        timings[name] = time.perf_counter() - started
+        return result
+
+    def streamed_analysis(predictions):
+        analysis = {}
+        for _, analysis in stream_analysis(predictions, 42):
+            pass
+        return analysis
+
+    def streamed_chat(medical_context):
+        chatbot = initialize_langchain_chatbot(get_medical_context_string(medical_context))
+        reply = ""
+        for reply in stream_chatbot_response(chatbot, CHAT_QUESTION):
+            pass
+        return reply
+
+    started = time.perf_counter()
+    try:
+        predictions = timed("detect", run_detection, image)
+        medical_context = build_medical_context(predictions, 42)
+        analysis = {}
+        if predictions:
+            if stream:
+                analysis = timed("analyze", streamed_analysis, predictions)
+            else:
+                analysis, _ = timed("analyze", analyze_detection, predictions, 42)
+        annotated = timed("boxes", process_detection_image, image, predictions)
+        if stream:
+            timed("chat", streamed_chat, medical_context)
+        else:
+            timed("chat", answer_question, medical_context, CHAT_QUESTION, [])
+        report_data = build_report_data("benchmark.jpg", {}, predictions, analysis)
+        timed("report", generate_pdf_bytes, report_data, annotated)
+    except Exception as e:
+        return timings, f"{stage}:{getattr(e, 'code', None) or type(e).__name__}"
+
+    timings["end_to_end"] = time.perf_counter() - started
+    return timings, None
+
+
+# ---- Statistics ----
+
+def latency_summary(values):
+    """Seconds → milliseconds summary; percentiles interpolate between samples"""
+    if not values:
+        return None
+    if len(values) > 1:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = values[0]
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def run_level(images, concurrency, stream):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+        outcomes = list(pool.map(lambda image: run_session(image, stream), images))
+    wall_time = time.perf_counter() - started
+
+    errors = {}
+    for _, error in outcomes:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    succeeded = sum(1 for _, error in outcomes if error is None)
+    return {
+        "concurrency": concurrency,
+        "sessions": len(images),
+        "succeeded": succeeded,
+        "failed": len(images) - succeeded,
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "throughput_per_s": succeeded / wall_time if wall_time else 0.0,
+        "latency": {
+            stage: latency_summary([t[stage] for t, _ in outcomes if stage in t])
+            for stage in STAGES
+        },
+    }
+
+
+# ---- Regression Check ----
+
+def compare(results, baseline, tolerance, floor_ms=5.0):
+    """Regressions of p95 latency or throughput beyond ``tolerance`` (a fraction)"""
+    regressions = []
+    previous = {run["concurrency"]: run for run in baseline.get("runs", [])}
+    for run in results["runs"]:
+        before = previous.get(run["concurrency"])
+        if before is None:
+            continue
+        level = f"concurrency {run['concurrency']}"
+        for stage, now in run["latency"].items():
+            then = before["latency"].get(stage)
+            if now and then and now["p95_ms"] > then["p95_ms"] * (1 + tolerance) \
+                    and now["p95_ms"] - then["p95_ms"] > floor_ms:
+                regressions.append(f"{level}: {stage} p95 {then['p95_ms']:.1f} → {now['p95_ms']:.1f} ms")
+        if run["throughput_per_s"] < before["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{level}: throughput {before['throughput_per_s']:.2f} → "
+                               f"{run['throughput_per_s']:.2f} sessions/s")
+    return regressions
+
+
+# ---- Reporting ----
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_run(run):
+    print(f"\nconcurrency {run['concurrency']}: {run['succeeded']}/{run['sessions']} sessions in "
+          f"{run['wall_time_s']:.1f}s · {run['throughput_per_s']:.2f} sessions/s")
+    print(f"  {'stage':<11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for stage in STAGES:
+        s = run["latency"][stage]
+        if s:
+            print(f"  {stage:<11} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    for error, count in sorted(run["errors"].items()):
+        print(f"  failed at {error}: {count}")
+
+
+def parse_levels(value):
+    return [int(v) for v in value.split(",")]
+
+
+def parse_size(value):
+    return tuple(int(v) for v in value.split("x"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=24, help="sessions per concurrency level")
+    parser.add_argument("--concurrency", type=parse_levels, default=[1, 4, 8])
+    parser.add_argument("--size", type=parse_size, default=(1280, 960), help="scan size WxH")
+    parser.add_argument("--stream", action="store_true", help="stream the analysis and the chat reply")
+    parser.add_argument("--warm-caches", action="store_true")
+    parser.add_argument("--roboflow-latency", type=float, default=0.25)
+    parser.add_argument("--roboflow-failure-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="seconds to first byte")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-stream-chunks", type=int, default=12)
+    parser.add_argument("--gemini-chunk-delay", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_e2e_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/throughput change")
+    args = parser.parse_args()
+
+    roboflow = FakeRoboflowServer(FakeServiceConfig(
+        latency=args.roboflow_latency, jitter=args.roboflow_latency / 4,
+        failure_rate=args.roboflow_failure_rate, seed=args.seed
+    )).start()
+    gemini = FakeGeminiServer(FakeServiceConfig(
+        latency=args.gemini_latency, jitter=args.gemini_jitter, failure_rate=args.gemini_failure_rate,
+        stream_chunks=args.gemini_stream_chunks, chunk_delay=args.gemini_chunk_delay, seed=args.seed + 1
+    )).start()
+    configure_environment(roboflow.url, gemini.url, args.warm_caches)
+
+    try:
+        # Warm-up: SDK imports, client construction and first connections
+        run_session(session_images(1, *args.size)[0], args.stream)
+        from utils.metrics import registry, metrics_snapshot
+        registry.reset()
+        fake_requests = (roboflow.requests, gemini.requests)
+
+        runs = []
+        for level, concurrency in enumerate(args.concurrency):
+            images = session_images(args.sessions * (level + 1), *args.size)[args.sessions * level:]
+            run = run_level(images, concurrency, args.stream)
+            print_run(run)
+            runs.append(run)
+    finally:
+        roboflow.stop()
+        gemini.stop()
+
+    results = {
+        "benchmark": "e2e",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "runs": runs,
+        "fake_requests": {
+            "roboflow": roboflow.requests - fake_requests[0],
+            "gemini": gemini.requests - fake_requests[1],
+            "injected_failures": roboflow.failures + gemini.failures,
+        },
+        "stage_metrics": metrics_snapshot(),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
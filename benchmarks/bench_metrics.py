@@ -0,0 +1,56 @@
+"""Benchmark: instrumentation overhead per stage call
+
+Times a trivial function called bare, through ``timed_stage`` and inside
+``span``, with ``METRICS_ENABLED`` on and off. Each setting runs in a
+fresh interpreter because the flag is read at import time.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SNIPPET = """
+import json, sys, timeit
+from utils.metrics import span, timed_stage
+
+def stage():
+    return None
+
+decorated = timed_stage("bench")(stage)
+
+def in_span():
+    with span("bench"):
+        return None
+
+calls = int(sys.argv[1])
+print(json.dumps({
+    name: min(timeit.repeat(fn, number=calls, repeat=5)) / calls * 1e9
+    for name, fn in (("bare", stage), ("timed_stage", decorated), ("span", in_span))
+}))
+"""
+
+
+def run(enabled, calls):
+    env = {**os.environ, "METRICS_ENABLED": "1" if enabled else "0"}
+    result = subprocess.run([sys.executable, "-c", SNIPPET, str(calls)],
+                            capture_output=True, text=True, check=True, env=env)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'call':<12} {'disabled ns':>12} {'enabled ns':>11}")
+    disabled, enabled = run(False, args.calls), run(True, args.calls)
+    for name in ("bare", "timed_stage", "span"):
+        print(f"{name:<12} {disabled[name]:>12.0f} {enabled[name]:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: analysis parse time and failure rate on recorded responses
+
+Parses every response in ``benchmarks/corpus/analysis`` with the text
+parser (``parse_gemini_response``), the streaming parser
+(``IncrementalAnalysisParser``) and, for ``*.json`` files, the
+structured parser (``parse_structured_response``).
+
+A text parse counts as failed when chart data is missing, a core
+section is empty, or chart JSON leaked into a section's text.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser --iterations 200
+"""
+import argparse
+import glob
+import logging
+import os
+import time
+
+from config.prompts import ANALYSIS_RESPONSE_SCHEMA
+from utils.parser_utils import (
+    parse_gemini_response,
+    parse_structured_response,
+    IncrementalAnalysisParser,
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus", "analysis")
+CORE_SECTIONS = ("overview", "severity", "symptoms", "prevention", "red_flags", "disclaimer")
+
+
+def parse_incremental(text, chunk_size=64):
+    parser = IncrementalAnalysisParser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    parser.finish()
+    return parser.sections
+
+
+def failure_reason(sections):
+    if sections is None:
+        return "rejected"
+    if not sections.get("chart_data"):
+        return "no chart_data"
+    for key in CORE_SECTIONS:
+        if not sections.get(key):
+            return f"empty {key}"
+        if "detection_confidence" in str(sections[key]):
+            return f"JSON leaked into {key}"
+    return None
+
+
+def run(name, parse, texts, iterations):
+    failures = {}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for path, text in texts:
+            reason = failure_reason(parse(text))
+            if reason:
+                failures[os.path.basename(path)] = reason
+    per_parse_us = (time.perf_counter() - started) / (iterations * len(texts)) * 1e6
+
+    print(f"{name:<12} {per_parse_us:8.1f} µs/parse   failed {len(failures)}/{len(texts)}")
+    for file_name, reason in sorted(failures.items()):
+        print(f"{'':<14}{file_name}: {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # parse_gemini_response reports chart errors through st.warning
+    logging.getLogger("streamlit").setLevel(logging.CRITICAL)
+
+    def load(pattern):
+        return [(p, open(p, encoding="utf-8").read()) for p in sorted(glob.glob(os.path.join(CORPUS_DIR, pattern)))]
+
+    text_corpus = load("*.txt")
+    json_corpus = load("*.json")
+
+    print(f"Corpus: {len(text_corpus)} text, {len(json_corpus)} JSON responses, {args.iterations} iterations")
+    run("text", parse_gemini_response, text_corpus, args.iterations)
+    run("incremental", parse_incremental, text_corpus, args.iterations)
+    run("structured", lambda t: parse_structured_response(t, ANALYSIS_RESPONSE_SCHEMA), json_corpus, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: bounding-box rendering on large images and dense predictions
+
+Compares the previous ``process_detection_image`` (RGB→BGR conversion,
+a defensive copy, boxes drawn on the BGR array, conversion back) with
+the single-buffer RGB renderer in ``utils.image_utils``. Reports the
+median wall time and the peak extra memory (``tracemalloc``) per render.
+
+Run from the repository root:
+    python -m benchmarks.bench_render --sizes 1280x960,4032x3024,8000x6000 --boxes 1,100,1000,5000
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.bench_transport import synthetic_image
+from config.settings import BOX_FILL_ALPHA
+from utils.image_utils import process_detection_image
+
+CLASSES = ["Acute Otitis Media", "Chronic Otitis Media", "Earwax", "Otitis Externa", "Normal"]
+
+
+def legacy_render(uploaded_image, predictions):
+    """The renderer this benchmark replaced, kept verbatim for comparison"""
+    image_array = np.array(uploaded_image)
+    image_bgr = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+    image_with_boxes = image_bgr.copy()
+    for pred in predictions:
+        x, y = int(pred['x'] - pred['width'] / 2), int(pred['y'] - pred['height'] / 2)
+        w, h = int(pred['width']), int(pred['height'])
+        cv2.rectangle(image_with_boxes, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        label = f"{pred['class']}: {pred['confidence']:.2f}"
+        cv2.putText(image_with_boxes, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return Image.fromarray(cv2.cvtColor(image_with_boxes, cv2.COLOR_BGR2RGB))
+
+
+def synthetic_predictions(count, width, height):
+    """Boxes of 2-15% of the image side scattered uniformly"""
+    rng = np.random.default_rng(count)
+    side = max(width, height)
+    sizes = rng.uniform(0.02, 0.15, (count, 2)) * side
+    return [
+        {
+            'x': float(rng.uniform(0, width)),
+            'y': float(rng.uniform(0, height)),
+            'width': float(w),
+            'height': float(h),
+            'class': CLASSES[i % len(CLASSES)],
+            'confidence': float(rng.uniform(0.3, 0.99)),
+        }
+        for i, (w, h) in enumerate(sizes)
+    ]
+
+
+def measure(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 2 ** 20
+
+
+def parse_sizes(value):
+    return [tuple(int(v) for v in size.split("x")) for size in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1280x960,4032x3024,8000x6000"))
+    parser.add_argument("--boxes", default="1,100,1000,5000")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    counts = [int(c) for c in args.boxes.split(",")]
+
+    print(f"fill alpha {BOX_FILL_ALPHA} (set BOX_FILL_ALPHA=0 for outlines only)")
+    print(f"{'image':>10} {'boxes':>6} {'legacy ms':>10} {'legacy MiB':>11} {'new ms':>8} {'new MiB':>8}")
+    for width, height in args.sizes:
+        image = synthetic_image(width, height)
+        for count in counts:
+            predictions = synthetic_predictions(count, width, height)
+            legacy_ms, legacy_mib = measure(lambda: legacy_render(image, predictions), args.iterations)
+            new_ms, new_mib = measure(lambda: process_detection_image(image, predictions), args.iterations)
+            print(f"{width}x{height:<5} {count:>6} {legacy_ms:>10.1f} {legacy_mib:>11.1f} "
+                  f"{new_ms:>8.1f} {new_mib:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
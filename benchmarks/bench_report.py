@@ -0,0 +1,80 @@
+"""Benchmark: PDF report render time and size by scan resolution
+
+For each resolution the annotated scan is embedded three ways: as a
+full-resolution JPEG, as the default downscaled JPEG (REPORT_IMAGE_MAX_SIDE
+/ REPORT_IMAGE_JPEG_QUALITY), and as a repeated request served from the
+PDF cache. A report without an image is included as the baseline.
+
+Run from the repository root:
+    python -m benchmarks.bench_report --sizes 640x480,1920x1440,4032x3024 --iterations 5
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_transport import synthetic_image
+from services import report_service
+from services.report_service import render_pdf, generate_pdf_bytes
+from config.settings import REPORT_IMAGE_MAX_SIDE, REPORT_IMAGE_JPEG_QUALITY
+from utils.image_utils import process_detection_image
+
+REPORT_DATA = {
+    'report_id': "RPT-BENCH",
+    'report_date': "January 01, 2026 at 09:00 AM",
+    'patient': {'id': "PAT-0001", 'name': "Jane Doe", 'age': 34, 'gender': "Female"},
+    'detection': {'infections': [{'name': "Acute Otitis Media", 'confidence': "91.70%"}]},
+    'analysis': {
+        'overview': "Findings are consistent with acute otitis media. " * 6,
+        'severity': "Moderate; follow up within 48 hours if symptoms persist.",
+    },
+    'doctor_notes': "None provided",
+}
+
+
+def annotated_image(width, height):
+    image = synthetic_image(width, height)
+    box = {'x': width / 2, 'y': height / 2, 'width': width / 3, 'height': height / 3,
+           'class': "Acute Otitis Media", 'confidence': 0.917}
+    return process_detection_image(image, [box])
+
+
+def timed(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="640x480,1280x960,1920x1440,4032x3024")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"default embed: longest side {REPORT_IMAGE_MAX_SIDE}px, JPEG q{REPORT_IMAGE_JPEG_QUALITY}")
+    print(f"{'image':>10} {'variant':<14} {'p50 ms':>9} {'PDF KiB':>9}")
+
+    ms, size = timed(lambda: render_pdf(REPORT_DATA), args.iterations)
+    print(f"{'none':>10} {'text only':<14} {ms:9.1f} {size / 1024:9.1f}")
+
+    for spec in args.sizes.split(","):
+        width, height = (int(v) for v in spec.lower().split("x"))
+        image = annotated_image(width, height)
+
+        rows = [
+            ("full-res", lambda: render_pdf(REPORT_DATA, image, max_side=0)),
+            ("downscaled", lambda: render_pdf(REPORT_DATA, image)),
+        ]
+        report_service._pdf_cache.clear()
+        generate_pdf_bytes(REPORT_DATA, image)
+        rows.append(("cached", lambda: generate_pdf_bytes(REPORT_DATA, image)))
+
+        for name, fn in rows:
+            ms, size = timed(fn, args.iterations)
+            print(f"{spec:>10} {name:<14} {ms:9.1f} {size / 1024:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
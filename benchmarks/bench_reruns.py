@@ -0,0 +1,104 @@
+"""Benchmark: server time and bytes per interaction, full rerun vs fragment
+
+Seeds a session that has finished detection, analysis and a few chat
+turns (nothing calls Roboflow or Gemini), then runs ``app.py`` under
+``AppTest`` with the rerun timer on. A full run records the whole app
+plus each tab fragment nested inside it:
+
+* app: what every chat message, upload or form edit used to cost
+* detection / analysis / chat / report: what an interaction inside that
+  section costs now that it reruns only its own fragment
+
+``AppTest`` always executes the full script, so fragment costs are the
+nested measurements rather than separate fragment-only runs.
+
+Run from the repository root:
+    python -m benchmarks.bench_reruns --size 4032x3024 --runs 5
+"""
+import argparse
+import os
+import statistics
+
+os.environ["RERUN_TIMER"] = "1"
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from benchmarks.bench_charts import CHART_DATA  # noqa: E402
+from benchmarks.bench_transport import synthetic_image  # noqa: E402
+from utils.image_utils import process_detection_image  # noqa: E402
+
+SCOPES = ("app", "detection", "analysis", "chat", "report")
+
+PREDICTIONS = [{'x': 2000, 'y': 1500, 'width': 900, 'height': 700, 'class': "Acute Otitis Media", 'confidence': 0.917}]
+
+ANALYSIS = {
+    'overview': "Findings are consistent with acute otitis media of the left ear.",
+    'severity': "Moderate. The tympanic membrane is bulging with visible erythema.",
+    'symptoms': ["Ear pain", "Reduced hearing", "Fever"],
+    'prevention': ["Keep the ear dry", "Treat upper respiratory infections early"],
+    'red_flags': ["Swelling behind the ear", "High fever above 39°C"],
+    'disclaimer': "This analysis supports, and does not replace, a clinical examination.",
+    'chart_data': CHART_DATA,
+}
+
+CHAT_HISTORY = [
+    {'role': 'user' if i % 2 == 0 else 'assistant',
+     'content': "How serious is this infection?" if i % 2 == 0 else
+                "It is a moderate middle ear infection. Most cases settle within a few days with treatment."}
+    for i in range(8)
+]
+
+
+def seeded_app(width, height):
+    image = synthetic_image(width, height)
+    at = AppTest.from_file("app.py", default_timeout=120)
+    state = {
+        'detection_done': True,
+        'uploaded_images': [image],
+        'uploaded_image': image,
+        'predictions': PREDICTIONS,
+        'detected_classes': [p['class'] for p in PREDICTIONS],
+        'batch_results': [{'index': 0, 'predictions': PREDICTIONS, 'error': None, 'latency': 0.8}],
+        'processed_images': {0: process_detection_image(image, PREDICTIONS)},
+        'medical_context': {'condition': PREDICTIONS[0]['class'], 'confidence': 91.7},
+        'analysis': ANALYSIS,
+        'chart_data': CHART_DATA,
+        'chat_history': CHAT_HISTORY,
+    }
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def parse_size(value):
+    return tuple(int(v) for v in value.split("x"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=(4032, 3024))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    at = seeded_app(*args.size)
+    at.run()  # warm-up: first encodes, chart specs, imports
+    if at.exception:
+        raise SystemExit(f"app raised: {at.exception[0].message}")
+
+    samples = {scope: [] for scope in SCOPES}
+    for _ in range(args.runs):
+        at.run()
+        for entry in at.session_state["rerun_log"][-len(SCOPES):]:
+            samples[entry['scope']].append(entry)
+
+    width, height = args.size
+    print(f"Seeded session, {width}x{height} scan, median of {args.runs} runs")
+    print(f"{'scope':<10} {'server ms':>10} {'KiB sent':>9}")
+    for scope in SCOPES:
+        entries = samples[scope]
+        print(f"{scope:<10} {statistics.median(e['ms'] for e in entries):>10.1f} "
+              f"{statistics.median(e['bytes'] for e in entries) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""Benchmark: resident memory and interaction latency per Streamlit session
+
+Starts ``streamlit run app.py`` against the local Roboflow and Gemini
+stand-ins from ``benchmarks.fake_services`` and drives it with headless
+clients that speak the browser's websocket protocol. Every simulated
+visitor uploads its own scan, runs detection, waits for the boxes and the
+analysis, asks ``--chat-turns`` questions and builds the PDF, then keeps
+its tab open, so the server holds its images, report, chatbot and charts.
+
+Sessions are added in steps up to each level of ``--levels``; the new
+sessions of a step run their flow concurrently. After each step every
+open session sends one more chat message at the same time and the
+server's RSS is read. The report gives:
+
+* the growth curve: server RSS against open sessions, with the marginal
+  cost per session from a least-squares fit (``--pod-memory-mb`` turns
+  that into a session limit)
+* p50/p95 latency and bytes received for each interaction as the number
+  of sessions rises
+* the RSS left after every session has closed (finished jobs keep their
+  PDFs and images for ``JOB_RESULT_TTL``)
+
+Like a browser, the client reruns only the fragment that holds a clicked
+widget and polls background-job panels through their auto-rerun
+fragments (every ``--poll-interval`` rather than the app's own interval,
+falling back to a full rerun when none is registered). Closed sessions
+are dropped at once (``server.disconnectedSessionTTL=0``) so the warm-up
+session is not counted. Caches are disabled so every session pays for its
+own calls; ``--warm-caches`` keeps them. RSS is read from ``/proc`` and
+needs Linux.
+
+Run from the repository root:
+    python -m benchmarks.bench_sessions --levels 1,5,10,20 --output sessions.json
+    python -m benchmarks.bench_sessions --levels 10,40 --size 4032x3024 --pod-memory-mb 2048
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from benchmarks.bench_e2e import (
+    configure_environment,
+    git_commit,
+    latency_summary,
+    parse_levels,
+    parse_size,
+    session_images,
+)
+from benchmarks.fake_services import FakeRoboflowServer, FakeGeminiServer, FakeServiceConfig
+
+INTERACTIONS = ("first_paint", "upload", "detect", "results_ready", "chat", "report_ready", "chat_all_open")
+
+QUESTIONS = [
+    "How serious is this infection?",
+    "What should I do next?",
+    "Can I go swimming this week?",
+    "When should I see a doctor in person?",
+]
+
+# Page text that marks a finished stage
+PIPELINE_DONE = "Post-detection pipeline:"
+NO_FINDINGS = "No infections detected"
+REPORT_READY = "Download PDF Report"
+
+MIB = 1024 * 1024
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def encode_scan(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# ---- Streamlit Server ----
+
+class StreamlitServer:
+    """``streamlit run app.py`` in a child process on a free local port"""
+
+    def __init__(self, log_path, startup_timeout=60.0):
+        self.port = free_port()
+        self.log_path = log_path
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        command = [
+            sys.executable, "-m", "streamlit", "run", "app.py",
+            "--server.headless=true",
+            "--server.address=127.0.0.1",
+            f"--server.port={self.port}",
+            "--server.fileWatcherType=none",
+            "--server.enableXsrfProtection=false",
+            "--server.disconnectedSessionTTL=0",
+            "--browser.gatherUsageStats=false",
+        ]
+        with open(self.log_path, "wb") as log:
+            self.process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with {self.process.returncode}; see {self.log_path}")
+            try:
+                if requests.get(f"{self.url}/_stcore/health", timeout=1).ok:
+                    return self
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"streamlit did not become healthy; see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def rss_bytes(self):
+        with open(f"/proc/{self.process.pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        raise RuntimeError("VmRSS missing from /proc status")
+
+
+# ---- Headless Client ----
+
+class HeadlessSession:
+    """One visitor's tab: a websocket session that reruns the script like a browser"""
+
+    def __init__(self, server_url, scan, poll_interval, wait_timeout):
+        self.server_url = server_url
+        self.scan = scan
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.ws = None
+        self.session_id = None
+        self.widgets = {}         # label → (widget id, fragment id)
+        self.values = {}          # widget id → WidgetState sent on every rerun
+        self.page = {}            # delta path → element text
+        self.auto_reruns = set()  # fragments the app asked to be polled
+        self.timings = {}
+        self.received = {}
+        self.turns = 0
+
+    async def connect(self):
+        ws_url = self.server_url.replace("http://", "ws://") + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        """Send the widget states and read messages until the runs it causes
+        are complete; returns bytes received"""
+        msg = BackMsg()
+        msg.rerun_script.fragment_id = fragment_id
+        widget_states = msg.rerun_script.widget_states.widgets
+        widget_states.extend(self.values.values())
+        if trigger is not None:
+            widget_states.add(id=trigger, trigger_value=True)
+        await self.ws.send(msg.SerializeToString())
+
+        received = 0
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), self.wait_timeout)
+            received += len(raw)
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = forward.new_session.initialize.session_id
+                if not forward.new_session.fragment_ids_this_run:
+                    self.page.clear()
+                    self.auto_reruns.clear()
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.read_element(forward.delta, tuple(forward.metadata.delta_path))
+            elif kind == "auto_rerun":
+                self.auto_reruns.add(forward.auto_rerun.fragment_id)
+            elif kind == "stop_auto_rerun":
+                self.auto_reruns.difference_update(forward.stop_auto_rerun.fragment_ids)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app.py failed to compile")
+                if forward.script_finished in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                               ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    return received
+
+    def read_element(self, delta, path):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        proto = getattr(element, kind)
+        if kind == "exception":
+            raise RuntimeError(f"app raised {proto.type}: {proto.message}")
+        if getattr(proto, "id", "") and hasattr(proto, "label"):
+            self.widgets[proto.label] = (proto.id, delta.fragment_id)
+        if kind == "imgs":
+            self.page[path] = " ".join(img.caption for img in proto.imgs)
+        else:
+            self.page[path] = getattr(proto, "body", "") or getattr(proto, "label", "")
+
+    async def click(self, label):
+        """Press a button, rerunning only its fragment as the browser does"""
+        widget_id, fragment_id = next(w for text, w in self.widgets.items() if label in text)
+        return await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+
+    def widget_id(self, label):
+        return next(w for text, w in self.widgets.items() if label in text)[0]
+
+    def shows(self, text):
+        return any(text in line for line in self.page.values())
+
+    async def timed(self, name, interaction):
+        started = time.perf_counter()
+        received = await interaction()
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+        self.received.setdefault(name, []).append(received)
+
+    async def wait_for(self, *texts):
+        """Rerun (as the job-panel fragments do) until the page shows one of ``texts``"""
+        deadline = time.monotonic() + self.wait_timeout
+        received = 0
+        while not any(self.shows(text) for text in texts):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"timed out waiting for {texts[0]!r}")
+            await asyncio.sleep(self.poll_interval)
+            if self.auto_reruns:
+                for fragment_id in list(self.auto_reruns):
+                    received += await self.rerun(fragment_id=fragment_id)
+            else:
+                received += await self.rerun()
+        return received
+
+    # ---- Interactions ----
+
+    async def upload(self):
+        """PUT the scan to the upload endpoint, then rerun with it selected"""
+        file_id = str(uuid.uuid4())
+        upload_url = f"/_stcore/upload_file/{self.session_id}/{file_id}"
+        response = await asyncio.to_thread(
+            requests.put, self.server_url + upload_url,
+            files={"file": ("scan.jpg", self.scan, "image/jpeg")}, timeout=self.wait_timeout
+        )
+        response.raise_for_status()
+
+        state = WidgetState(id=self.widget_id("Upload ear images"))
+        info = state.file_uploader_state_value.uploaded_file_info.add(name="scan.jpg", size=len(self.scan), file_id=file_id)
+        info.file_urls.file_id = file_id
+        info.file_urls.upload_url = upload_url
+        info.file_urls.delete_url = upload_url
+        self.values[state.id] = state
+        return await self.rerun()
+
+    async def detect(self):
+        """Click → boxes and analysis on screen (the detection rerun is timed on its own)"""
+        await self.timed("detect", lambda: self.click("Run Detection"))
+        return self.received["detect"][-1] + await self.wait_for(PIPELINE_DONE, NO_FINDINGS)
+
+    async def ask(self):
+        question = QUESTIONS[self.turns % len(QUESTIONS)]
+        self.turns += 1
+        state = WidgetState(id=self.widget_id("Ask Dr. Chen"), string_value=question)
+        self.values[state.id] = state
+        received = await self.click("Send")
+        if not self.shows(question):
+            raise RuntimeError("chat turn was not answered")
+        return received
+
+    async def report(self):
+        received = await self.click("Generate PDF Report")
+        return received + await self.wait_for(REPORT_READY)
+
+    async def run_flow(self, chat_turns):
+        """Upload → detection → boxes + analysis → chat → PDF"""
+        await self.connect()
+        await self.timed("first_paint", self.rerun)
+        await self.timed("upload", self.upload)
+        await self.timed("results_ready", self.detect)
+        for _ in range(chat_turns):
+            await self.timed("chat", self.ask)
+        await self.timed("report_ready", self.report)
+        self.scan = None
+
+
+async def run_concurrently(sessions, interaction):
+    """Run ``interaction(session)`` for every session at once; returns the failures"""
+    errors = {}
+    outcomes = await asyncio.gather(*(interaction(s) for s in sessions), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            error = f"{type(outcome).__name__}: {outcome}"[:120]
+            errors[error] = errors.get(error, 0) + 1
+    return errors
+
+
+# ---- Growth Curve ----
+
+def linear_fit(xs, ys):
+    """Least-squares slope and intercept"""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+    return slope, mean_y - slope * mean_x
+
+
+def session_limit(pod_memory_mb, headroom, baseline, per_session):
+    """Open sessions that fit in the pod with ``headroom`` kept free"""
+    budget = pod_memory_mb * MIB * (1 - headroom) - baseline
+    if per_session <= 0 or budget <= 0:
+        return None
+    return int(budget // per_session)
+
+
+def settled_rss(server, settle):
+    """RSS once background jobs and freed buffers have had ``settle`` seconds"""
+    time.sleep(settle)
+    return server.rss_bytes()
+
+
+def print_step(step):
+    print(f"\n{step['open_sessions']} open sessions: server RSS {step['rss_mb']:.0f} MiB "
+          f"(+{step['per_session_mb']:.1f} MiB/session over baseline)")
+    print(f"  {'interaction':<14} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'KiB':>7} {'n':>4}")
+    for name in INTERACTIONS:
+        s = step["latency"][name]
+        if s:
+            print(f"  {name:<14} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['max_ms']:>8.1f} "
+                  f"{step['kib_received'][name]:>7.1f} {s['count']:>4}")
+    for error, count in sorted(step["errors"].items()):
+        print(f"  failed: {error} ×{count}")
+
+
+async def ramp(server, args, scans):
+    """Add sessions level by level; returns the baseline RSS and one record per step"""
+    def new_session():
+        return HeadlessSession(server.url, scans.pop(), args.poll_interval, args.timeout)
+
+    # Warm-up session (SDK imports, clients, chart templates), then closed
+    warm_up = new_session()
+    try:
+        await warm_up.run_flow(args.chat_turns)
+    finally:
+        await warm_up.close()
+    baseline = settled_rss(server, args.settle)
+    print(f"Baseline after warm-up: {baseline / MIB:.0f} MiB server RSS")
+
+    sessions, steps = [], []
+    try:
+        for level in sorted(set(args.levels)):
+            added = [new_session() for _ in range(level - len(sessions))]
+            errors = await run_concurrently(added, lambda s: s.run_flow(args.chat_turns))
+            sessions.extend(added)
+            for session in sessions:
+                session.timings.pop("chat_all_open", None)
+                session.received.pop("chat_all_open", None)
+            for error, count in (await run_concurrently(
+                    sessions, lambda s: s.timed("chat_all_open", s.ask))).items():
+                errors[error] = errors.get(error, 0) + count
+
+            rss = settled_rss(server, args.settle)
+            measured = {name: sessions if name == "chat_all_open" else added for name in INTERACTIONS}
+            step = {
+                "open_sessions": len(sessions),
+                "new_sessions": len(added),
+                "rss_mb": rss / MIB,
+                "per_session_mb": (rss - baseline) / len(sessions) / MIB,
+                "errors": errors,
+                "latency": {
+                    name: latency_summary([t for s in group for t in s.timings.get(name, [])])
+                    for name, group in measured.items()
+                },
+                "kib_received": {
+                    name: sum(b for s in group for b in s.received.get(name, [])) / max(1, sum(
+                        len(s.received.get(name, [])) for s in group)) / 1024
+                    for name, group in measured.items()
+                },
+            }
+            print_step(step)
+            steps.append(step)
+    finally:
+        for session in sessions:
+            await session.close()
+    return baseline, steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=parse_levels, default=[1, 4, 8, 16], help="open sessions after each step")
+    parser.add_argument("--size", type=parse_size, default=(1280, 960), help="scan size WxH")
+    parser.add_argument("--chat-turns", type=int, default=2, help="questions asked during each session's flow")
+    parser.add_argument("--warm-caches", action="store_true")
+    parser.add_argument("--roboflow-latency", type=float, default=0.25)
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="seconds to first byte")
+    parser.add_argument("--gemini-chunk-delay", type=float, default=0.05)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between job-panel reruns")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-interaction timeout in seconds")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait before reading RSS")
+    parser.add_argument("--pod-memory-mb", type=float, help="report the session limit for this pod size")
+    parser.add_argument("--headroom", type=float, default=0.2, help="fraction of pod memory kept free")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_sessions_results.json")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/status"):
+        raise SystemExit("bench_sessions reads server RSS from /proc and needs Linux")
+
+    roboflow = FakeRoboflowServer(FakeServiceConfig(
+        latency=args.roboflow_latency, jitter=args.roboflow_latency / 4, seed=args.seed
+    )).start()
+    gemini = FakeGeminiServer(FakeServiceConfig(
+        latency=args.gemini_latency, jitter=args.gemini_latency / 4,
+        chunk_delay=args.gemini_chunk_delay, seed=args.seed + 1
+    )).start()
+    # The server process inherits the fake endpoints through its environment
+    configure_environment(roboflow.url, gemini.url, args.warm_caches)
+
+    levels = sorted(set(args.levels))
+    scans = [encode_scan(image) for image in session_images(levels[-1] + 1, *args.size)]
+    server = StreamlitServer(os.path.join(tempfile.gettempdir(), "bench_sessions_streamlit.log"))
+
+    try:
+        server.start()
+        baseline, steps = asyncio.run(ramp(server, args, scans))
+        after_close = settled_rss(server, args.settle)
+    finally:
+        server.stop()
+        roboflow.stop()
+        gemini.stop()
+
+    if len(steps) > 1:
+        slope, intercept = linear_fit([s["open_sessions"] for s in steps], [s["rss_mb"] * MIB for s in steps])
+    else:
+        slope, intercept = steps[0]["per_session_mb"] * MIB, baseline
+    print(f"\nGrowth: {slope / MIB:.1f} MiB per additional session (fit intercept {intercept / MIB:.0f} MiB)")
+    print(f"After all sessions closed: {after_close / MIB:.0f} MiB server RSS")
+    limit = None
+    if args.pod_memory_mb:
+        limit = session_limit(args.pod_memory_mb, args.headroom, baseline, slope)
+        print(f"Session limit for a {args.pod_memory_mb:.0f} MiB pod with {args.headroom:.0%} headroom: "
+              f"{limit if limit is not None else 'n/a'}")
+
+    results = {
+        "benchmark": "sessions",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "baseline_rss_mb": baseline / MIB,
+        "marginal_mb_per_session": slope / MIB,
+        "fit_intercept_mb": intercept / MIB,
+        "after_close_rss_mb": after_close / MIB,
+        "session_limit": limit,
+        "steps": steps,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark: cold-start import cost and time to first paint
+
+Each measurement runs in a fresh interpreter so nothing is already in
+``sys.modules``. Import times are measured after ``import streamlit``
+(which every run pays anyway). Time to first paint is the first
+``AppTest`` run of ``app.py`` with empty session state (what a new
+visitor triggers on a freshly started process); the heavy modules that
+run loaded are listed too.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --repeat 3
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+APP_MODULES = [
+    "config.api_config",
+    "services.detection_service",
+    "services.analysis_service",
+    "services.chatbot_service",
+    "services.report_service",
+    "services.pipeline",
+    "ui.analysis_view",
+    "utils.image_utils",
+]
+
+HEAVY_MODULES = [
+    "google.generativeai",
+    "inference_sdk",
+    "langchain",
+    "langchain_google_genai",
+    "reportlab",
+    "plotly.graph_objects",
+    "cv2",
+]
+
+IMPORT_SNIPPET = """
+import sys, time, importlib
+import streamlit
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(time.perf_counter() - started)
+"""
+
+FIRST_PAINT_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+ready = time.perf_counter()
+at.run()
+done = time.perf_counter()
+heavy = json.loads(sys.argv[1])
+print(json.dumps({
+    "first_paint": done - ready,
+    "harness": ready - started,
+    "loaded": [m for m in heavy if m in sys.modules],
+    "exception": bool(at.exception),
+}))
+"""
+
+
+def run_python(snippet, *args):
+    result = subprocess.run(
+        [sys.executable, "-c", snippet, *args],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("Import time after `import streamlit` (fresh interpreter, median)")
+    for module in APP_MODULES + HEAVY_MODULES:
+        times = [float(run_python(IMPORT_SNIPPET, module)) for _ in range(args.repeat)]
+        print(f"  {module:<30} {statistics.median(times) * 1000:8.0f} ms")
+
+    print("\nTime to first paint (first AppTest run of app.py)")
+    runs = [json.loads(run_python(FIRST_PAINT_SNIPPET, json.dumps(HEAVY_MODULES))) for _ in range(args.repeat)]
+    print(f"  median {statistics.median(r['first_paint'] for r in runs) * 1000:8.0f} ms"
+          f"  (min {min(r['first_paint'] for r in runs) * 1000:.0f} ms)")
+    print(f"  heavy modules loaded: {', '.join(runs[-1]['loaded']) or 'none'}")
+    if any(r["exception"] for r in runs):
+        print("  warning: the app raised an exception during the first run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark: image transport overhead for the Roboflow workflow call
+
+Compares the legacy path (``NamedTemporaryFile(delete=False)`` + SDK
+reading the file back) with the in-memory base64 transport and the
+self-cleaning temp-file transport. No network calls are made; the SDK's
+own input loader is used so the measured work matches what happens
+before ``requests.post``.
+
+Run from the repository root:
+    python -m benchmarks.bench_transport --size 4000x3000 --iterations 20
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from inference_sdk.http.utils.loaders import load_static_inference_input
+
+from utils.image_utils import encode_image_base64, temporary_image_file
+
+
+def synthetic_image(width, height):
+    """Smooth gradient with mild noise, closer to a photo than pure noise"""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([xx / width * 200, yy / height * 160, (xx + yy) / (width + height) * 120], axis=-1)
+    noise = rng.normal(0, 6, base.shape)
+    return Image.fromarray(np.clip(base + noise + 30, 0, 255).astype(np.uint8))
+
+
+def legacy_transport(image):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+        image.save(temp_file.name)
+        temp_file_path = temp_file.name
+    return load_static_inference_input(temp_file_path)
+
+
+def memory_transport(image, quality):
+    return load_static_inference_input(encode_image_base64(image, quality))
+
+
+def file_transport(image, quality):
+    with temporary_image_file(image, quality) as path:
+        return load_static_inference_input(path)
+
+
+def measure(name, fn, iterations, scratch_dir):
+    before = len(os.listdir(scratch_dir))
+    timings = []
+    payload_size = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        payload = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        payload_size = len(payload[0][0])
+    growth = len(os.listdir(scratch_dir)) - before
+    print(f"{name:<10} p50={statistics.median(timings):8.1f} ms  "
+          f"max={max(timings):8.1f} ms  payload={payload_size / 1024:8.0f} KiB  "
+          f"tmp files +{growth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="4000x3000", help="WIDTHxHEIGHT of the synthetic image")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--quality", type=int, default=75)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    image = synthetic_image(width, height)
+
+    scratch_dir = tempfile.mkdtemp(prefix="bench_transport_")
+    previous_tempdir = tempfile.tempdir
+    tempfile.tempdir = scratch_dir
+    try:
+        print(f"Image {width}x{height}, {args.iterations} iterations, temp dir {scratch_dir}")
+        measure("legacy", lambda: legacy_transport(image), args.iterations, scratch_dir)
+        measure("memory", lambda: memory_transport(image, args.quality), args.iterations, scratch_dir)
+        measure("file", lambda: file_transport(image, args.quality), args.iterations, scratch_dir)
+    finally:
+        tempfile.tempdir = previous_tempdir
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
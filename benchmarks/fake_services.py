@@ -0,0 +1,268 @@
+"""Local stand-ins for the Roboflow workflow API and the Gemini REST API
+
+Both run as threaded stdlib HTTP servers on localhost so the real client
+code (pooled ``requests`` session, ``google-generativeai`` over REST,
+LangChain) is exercised end to end without keys, network or billing.
+
+* Roboflow: ``POST /<workspace>/workflows/<workflow_id>`` returns the
+  ``{"outputs": [{"predictions": {"predictions": [...]}}]}`` shape that
+  ``RoboflowWorkflowBackend.detect`` unpacks. Boxes are derived from a
+  hash of the uploaded image, so the same image always gets the same
+  predictions.
+* Gemini: ``:generateContent`` and ``:streamGenerateContent`` return the
+  canned analysis from ``benchmarks/corpus/analysis`` (JSON when the
+  request asks for ``application/json``) or a canned doctor reply for
+  chatbot prompts. Streams are sent as a chunked JSON array, as the REST
+  transport expects.
+
+Each server takes a ``FakeServiceConfig`` with its latency, jitter,
+failure rate and streaming cadence. Point the app at them with
+``ROBOFLOW_API_URL`` and ``GEMINI_API_ENDPOINT`` + ``GEMINI_TRANSPORT=rest``.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus", "analysis")
+
+DETECTION_CLASSES = ["Acute Otitis Media", "Chronic Otitis Media", "Earwax", "Otitis Externa", "Normal"]
+
+DOCTOR_REPLY = (
+    "This looks like a middle ear infection behind the eardrum. "
+    "It is common and usually settles within a few days with the right care. "
+    "Keep the ear dry and take pain relief as directed on the pack. "
+    "Please see an ENT doctor if the pain worsens or a fever develops."
+)
+
+# Chatbot prompts carry the doctor persona; analysis prompts do not
+CHAT_PROMPT_MARKER = "Dr. Sarah Chen"
+
+
+class FakeServiceConfig:
+    """Latency model and failure injection for one fake service (seconds)"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 stream_chunks=8, chunk_delay=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+class _FakeServer:
+    """Threaded HTTP server on an ephemeral localhost port"""
+
+    handler = None
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeServiceConfig()
+        self.requests = 0
+        self.failures = 0
+        self._counter_lock = threading.Lock()
+        handler = type("Handler", (self.handler,), {"service": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, failed):
+        with self._counter_lock:
+            self.requests += 1
+            self.failures += failed
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real APIs, so the pooled clients reuse connections
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+# ---- Roboflow ----
+
+def fake_predictions(image_payload, width=640, height=480):
+    """Deterministic boxes for an uploaded image (1-3 per image)"""
+    digest = hashlib.sha256(image_payload.encode("utf-8") if isinstance(image_payload, str) else image_payload).digest()
+    predictions = []
+    for i in range(1 + digest[0] % 3):
+        b = digest[4 * i + 1: 4 * i + 5]
+        box_w, box_h = 60 + b[2] % 200, 60 + b[3] % 160
+        predictions.append({
+            "x": float(box_w / 2 + b[0] / 255 * (width - box_w)),
+            "y": float(box_h / 2 + b[1] / 255 * (height - box_h)),
+            "width": float(box_w),
+            "height": float(box_h),
+            "confidence": round(0.55 + (b[0] ^ b[1]) / 255 * 0.44, 4),
+            "class": DETECTION_CLASSES[b[2] % len(DETECTION_CLASSES)],
+            "class_id": b[2] % len(DETECTION_CLASSES),
+            "detection_id": digest[:8].hex() + str(i),
+        })
+    predictions.sort(key=lambda p: p["confidence"], reverse=True)
+    return predictions
+
+
+class _RoboflowHandler(_JSONHandler):
+    def do_POST(self):
+        if not re.fullmatch(r"/[^/]+/workflows/[^/?]+", self.path.split("?")[0]):
+            self.send_json(404, {"message": "Not found"})
+            return
+
+        body = self.read_json()
+        time.sleep(self.service.config.delay())
+        if self.service.config.should_fail():
+            self.service.count(True)
+            self.send_json(500, {"message": "Injected workflow failure"})
+            return
+
+        image = body.get("inputs", {}).get("image", {})
+        payload = image.get("value", "") if isinstance(image, dict) else json.dumps(image)
+        self.service.count(False)
+        self.send_json(200, {"outputs": [{
+            "predictions": {
+                "image": {"width": 640, "height": 480},
+                "predictions": fake_predictions(payload),
+            }
+        }]})
+
+
+class FakeRoboflowServer(_FakeServer):
+    handler = _RoboflowHandler
+
+
+# ---- Gemini ----
+
+def _load_corpus(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _prompt_text(body):
+    return " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def _candidate(text, finished):
+    # finishReason 1 is STOP (the REST transport asks for integer enums)
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = 1
+    return {"candidates": [candidate]}
+
+
+def _split(text, parts):
+    size = max(1, -(-len(text) // max(1, parts)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _GeminiHandler(_JSONHandler):
+    analysis_text = None
+    analysis_json = None
+
+    def reply_for(self, body):
+        if CHAT_PROMPT_MARKER in _prompt_text(body):
+            return DOCTOR_REPLY
+        if body.get("generationConfig", {}).get("responseMimeType") == "application/json":
+            return self.analysis_json
+        return self.analysis_text
+
+    def do_POST(self):
+        match = re.fullmatch(r"/v1beta/models/[^/:]+:(generateContent|streamGenerateContent)", self.path.split("?")[0])
+        if not match:
+            self.send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        body = self.read_json()
+        config = self.service.config
+        time.sleep(config.delay())
+        if config.should_fail():
+            self.service.count(True)
+            self.send_json(503, {"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}})
+            return
+
+        self.service.count(False)
+        text = self.reply_for(body)
+        if match.group(1) == "generateContent":
+            self.send_json(200, _candidate(text, finished=True))
+            return
+
+        chunks = _split(text, config.stream_chunks)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(config.chunk_delay)
+            prefix = "[" if i == 0 else ",\r\n"
+            try:
+                self.send_chunk((prefix + json.dumps(_candidate(chunk, i == len(chunks) - 1))).encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                return  # the client stopped reading (e.g. the reply hit its sentence limit)
+        self.send_chunk(b"]")
+        self.send_chunk(b"")
+
+
+class FakeGeminiServer(_FakeServer):
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.handler = type("GeminiHandler", (_GeminiHandler,), {
+            "analysis_text": _load_corpus("text_01_clean.txt"),
+            "analysis_json": _load_corpus("json_01_clean.json"),
+        })
+        super().__init__(config, host, port)
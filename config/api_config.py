@@ -1,28 +1,217 @@
-import streamlit as st
-from inference_sdk import InferenceHTTPClient
-import google.generativeai as genai
+import os
+import threading
 
+import requests
+from requests.adapters import HTTPAdapter
 
-def get_roboflow_client():
+from config.settings import (
+    ROBOFLOW_API_URL,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    GEMINI_MODEL,
+    GEMINI_API_ENDPOINT,
+    GEMINI_TRANSPORT,
+    SECRETS_FILE,
+)
+from services.errors import ServiceError, CONFIG_ERROR
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# -------------------- Client Registry --------------------
+# Clients are built once per process and shared by every Streamlit session
+# and worker thread; the lock only guards construction. SDK modules are
+# imported inside the builders so startup does not pay for them.
+
+_clients = {}
+_clients_lock = threading.RLock()
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def reset_clients():
+    """Drop every pooled client (e.g. after rotating API keys)"""
+    with _clients_lock:
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if callable(close):
+                close()
+        _clients.clear()
+
+
+def get_http_session():
+    """Process-wide keep-alive session with a bounded connection pool"""
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return _get_or_create("http_session", build)
+
+
+# -------------------- Secrets --------------------
+
+_secrets = None
+
+
+def _load_secrets_file(path):
     try:
-        api_key = st.secrets["ROBOFLOW_API_KEY"]
-    except KeyError:
-        raise RuntimeError("ROBOFLOW_API_KEY not found in Streamlit secrets")
+        if tomllib is not None:
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        import toml
+        return toml.load(path)
+    except FileNotFoundError:
+        return {}
+
+
+def _read_secret(name):
+    """Environment first, then the secrets TOML (``.streamlit/secrets.toml`` by default)"""
+    global _secrets
+    value = os.environ.get(name)
+    if value:
+        return value
+
+    if _secrets is None:
+        _secrets = _load_secrets_file(SECRETS_FILE)
+    value = _secrets.get(name)
+    if not value:
+        raise ServiceError(CONFIG_ERROR, f"{name} is not set in the environment or {SECRETS_FILE}")
+    return value
+
+
+# -------------------- Roboflow --------------------
+
+class RoboflowWorkflowClient:
+    """Workflow client that reuses pooled connections.
+
+    ``InferenceHTTPClient.run_workflow`` posts with module-level
+    ``requests.post`` and offers no way to pass a session, so this mirrors
+    its named-workflow path (``_run_workflow``) from inference-sdk 0.45.1:
+    the same payload, ``DEFAULT_HEADERS``, ``wrap_errors`` error mapping
+    and ``decode_workflow_outputs``. requirements.txt pins that version;
+    re-check this copy when upgrading the SDK.
+    """
+
+    def __init__(self, api_url, api_key, session):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.session = session
 
-    return InferenceHTTPClient(
-        api_url="https://serverless.roboflow.com",
-        api_key=api_key
+    def run_workflow(self, workspace_name, workflow_id, images=None, parameters=None, use_cache=True):
+        from inference_sdk.http.client import wrap_errors
+
+        return wrap_errors(self._run_workflow)(workspace_name, workflow_id, images, parameters, use_cache)
+
+    def _run_workflow(self, workspace_name, workflow_id, images, parameters, use_cache):
+        from inference_sdk.http.client import DEFAULT_HEADERS
+        from inference_sdk.http.entities import InferenceConfiguration
+        from inference_sdk.http.utils.loaders import load_nested_batches_of_inference_input
+        from inference_sdk.http.utils.post_processing import decode_workflow_outputs
+        from inference_sdk.http.utils.requests import (
+            api_key_safe_raise_for_status,
+            inject_nested_batches_of_images_into_payload,
+        )
+
+        inputs = {}
+        for image_name, image in (images or {}).items():
+            inject_nested_batches_of_images_into_payload(
+                payload=inputs,
+                encoded_images=load_nested_batches_of_inference_input(inference_input=image),
+                key=image_name,
+            )
+        inputs.update(parameters or {})
+
+        response = self.session.post(
+            f"{self.api_url}/{workspace_name}/workflows/{workflow_id}",
+            json={"api_key": self.api_key, "use_cache": use_cache, "enable_profiling": False, "inputs": inputs},
+            headers=DEFAULT_HEADERS,
+            timeout=HTTP_TIMEOUT,
+        )
+        api_key_safe_raise_for_status(response=response)
+        return decode_workflow_outputs(
+            workflow_outputs=response.json()["outputs"],
+            expected_format=InferenceConfiguration().output_visualisation_format,
+        )
+
+
+def get_roboflow_api_key():
+    return _read_secret("ROBOFLOW_API_KEY")
+
+
+def get_roboflow_client():
+    return _get_or_create(
+        "roboflow",
+        lambda: RoboflowWorkflowClient(ROBOFLOW_API_URL, get_roboflow_api_key(), get_http_session())
     )
 
 
+# -------------------- Gemini --------------------
+
 def get_gemini_api_key():
-    try:
-        return st.secrets["GEMINI_API_KEY"]
-    except KeyError:
-        raise RuntimeError("GEMINI_API_KEY not found in Streamlit secrets")
+    return _read_secret("GEMINI_API_KEY")
+
+
+def _gemini_connection_options():
+    """Transport/endpoint overrides shared by the SDK and LangChain.
+
+    ``genai.configure`` is process-global and LangChain calls it too, so
+    both must pass the same options or the last caller wins.
+    """
+    options = {}
+    if GEMINI_TRANSPORT:
+        options["transport"] = GEMINI_TRANSPORT
+    if GEMINI_API_ENDPOINT:
+        options["client_options"] = {"api_endpoint": GEMINI_API_ENDPOINT}
+    return options
 
 
 def get_gemini_client():
-    api_key = get_gemini_api_key()
-    genai.configure(api_key=api_key)
-    return genai
+    """Configure the Gemini SDK once per process and return it"""
+    def build():
+        import google.generativeai as genai
+
+        genai.configure(api_key=get_gemini_api_key(), **_gemini_connection_options())
+        return genai
+
+    return _get_or_create("gemini", build)
+
+
+def get_gemini_model(model_name):
+    """Shared ``GenerativeModel``; its gRPC channel stays open between calls"""
+    return _get_or_create(
+        f"gemini_model:{model_name}",
+        lambda: get_gemini_client().GenerativeModel(model_name)
+    )
+
+
+def get_chat_llm():
+    """Shared LangChain chat model for the doctor chatbot.
+
+    Only conversation memory is per session; the model client (and its
+    connection) is built once per process.
+    """
+    def build():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=GEMINI_MODEL,
+            google_api_key=get_gemini_api_key(),
+            temperature=0.7,
+            max_output_tokens=1200,
+            **_gemini_connection_options()
+        )
+
+    return _get_or_create("chat_llm", build)
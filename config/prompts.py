@@ -130,4 +130,117 @@ After all sections, provide chart data in this exact JSON format:
     "Regular Check-ups": 4.8,
     "Proper Hygiene": 4.2
   }}
-}}"""
\ No newline at end of file
+}}"""
+
+_LABELED_VALUES = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "label": {"type": "string"},
+            "value": {"type": "number"}
+        },
+        "required": ["label", "value"]
+    }
+}
+
+_TEXT_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Gemini-compatible schema (no free-form maps, so chart series are label/value lists)
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overview": {"type": "string"},
+        "severity": {"type": "string"},
+        "visual_reasoning": {"type": "string"},
+        "timeline": {"type": "string"},
+        "symptoms": _TEXT_LIST,
+        "prevention": _TEXT_LIST,
+        "red_flags": _TEXT_LIST,
+        "disclaimer": {"type": "string"},
+        "chart_data": {
+            "type": "object",
+            "properties": {
+                "detection_confidence": {
+                    "type": "object",
+                    "properties": {
+                        "condition": {"type": "string"},
+                        "confidence_percent": {"type": "number"}
+                    },
+                    "required": ["condition", "confidence_percent"]
+                },
+                "severity_level": {
+                    "type": "object",
+                    "properties": {
+                        "label": {"type": "string"},
+                        "numeric_level": {"type": "integer"}
+                    },
+                    "required": ["label", "numeric_level"]
+                },
+                "symptom_probability_distribution": _LABELED_VALUES,
+                "infection_progress_timeline": _LABELED_VALUES,
+                "visual_feature_contribution": _LABELED_VALUES,
+                "prevention_effectiveness": _LABELED_VALUES
+            },
+            "required": [
+                "detection_confidence",
+                "severity_level",
+                "symptom_probability_distribution",
+                "infection_progress_timeline",
+                "visual_feature_contribution",
+                "prevention_effectiveness"
+            ]
+        }
+    },
+    "required": [
+        "overview",
+        "severity",
+        "visual_reasoning",
+        "timeline",
+        "symptoms",
+        "prevention",
+        "red_flags",
+        "disclaimer",
+        "chart_data"
+    ]
+}
+
+def get_structured_analysis_prompt(detected_condition, confidence, patient_age, visual_features):
+    """Generate analysis prompt for Gemini's JSON (response_schema) mode"""
+    return f"""You are a clinical decision-support AI integrated with a computer-vision ear infection detection system.
+
+Detected Condition: {detected_condition}
+Detection Confidence: {confidence:.2f}%
+Patient Age: {patient_age}
+Visual Indicators Detected: {', '.join(visual_features)}
+
+Return ONE JSON object (no markdown, no text outside the JSON) with these fields:
+
+- "overview": 2-3 lines explaining the detected condition and what the confidence level means.
+- "severity": severity classification (<60% → Mild / Early-stage, 60-85% → Moderate, >85% → High severity) with a short explanation.
+- "visual_reasoning": which visual indicators the AI detected and how they relate to the condition.
+- "timeline": the likely infection stage and possible progression over 3 days.
+- "symptoms": 4-5 probable symptoms, each with an estimated likelihood percentage that aligns with the confidence level.
+- "prevention": 4-5 condition-specific prevention tips.
+- "red_flags": 4-5 situations requiring immediate medical attention.
+- "disclaimer": a confidence-aware disclaimer.
+- "chart_data":
+  - "detection_confidence": {{"condition": "{detected_condition}", "confidence_percent": {confidence:.2f}}}
+  - "severity_level": {{"label": "Mild/Moderate/Severe", "numeric_level": 1-5}}
+  - "symptom_probability_distribution": list of {{"label": symptom, "value": percent}}, e.g. Ear Pain 85, Hearing Loss 65, Fever 70, Discharge 55
+  - "infection_progress_timeline": list of {{"label": "Day 1".."Day 3", "value": severity score 1-5}}
+  - "visual_feature_contribution": list of {{"label": feature, "value": percent}}, e.g. Redness 35, Inflammation 40, Structural Changes 25
+  - "prevention_effectiveness": list of {{"label": strategy, "value": score 1-5}}, e.g. Keep Ear Dry 4.5, Avoid Q-tips 4.0"""
+
+# Folds older consultation turns into a running summary (see services/chat_memory.py)
+CHAT_SUMMARY_PROMPT_TEMPLATE = """Progressively summarize this ENT consultation between a patient and Dr. Chen.
+Keep symptoms the patient reported, red flags raised, and advice already given.
+Add the new lines to the current summary and return the new summary in at most 120 words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
@@ -0,0 +1,179 @@
+"""Runtime Settings
+
+Tunables read from the environment so deployments can adjust them
+without code changes. API keys stay in ``api_config``.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_floats(name, default):
+    """Comma-separated floats, sorted; the default on a malformed value"""
+    value = os.environ.get(name, default)
+    try:
+        values = tuple(sorted(float(v) for v in value.split(",") if v.strip()))
+        if values:
+            return values
+    except ValueError:
+        pass
+    logger.warning("Ignoring invalid %s=%r, using %s", name, value, default)
+    return tuple(float(v) for v in default.split(","))
+
+
+# -------------------- API Clients --------------------
+
+# API keys are read from the environment, then from this TOML file
+SECRETS_FILE = os.environ.get("SECRETS_FILE", ".streamlit/secrets.toml")
+
+ROBOFLOW_API_URL = os.environ.get("ROBOFLOW_API_URL", "https://serverless.roboflow.com")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-3-flash-preview")
+# Override the Gemini endpoint (e.g. http://127.0.0.1:8900 for a local stand-in,
+# which needs GEMINI_TRANSPORT=rest); empty uses the SDK defaults
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT", "")
+GEMINI_TRANSPORT = os.environ.get("GEMINI_TRANSPORT", "")
+
+# Keep-alive connections per host shared by all sessions
+HTTP_POOL_SIZE = _env_int("HTTP_POOL_SIZE", 16)
+HTTP_TIMEOUT = _env_float("HTTP_TIMEOUT", 60)
+
+# -------------------- Clinical Analysis --------------------
+
+# Stream Gemini output and render each section as soon as it completes
+ANALYSIS_STREAMING = os.environ.get("ANALYSIS_STREAMING", "1").lower() not in ("0", "false", "no")
+
+# "text" parses the sectioned prose reply; "json" asks Gemini for
+# schema-constrained JSON and falls back to text if validation fails
+ANALYSIS_OUTPUT_MODE = os.environ.get("ANALYSIS_OUTPUT_MODE", "text")
+
+# Analysis cache: results shared by scans with the same condition and bands
+ANALYSIS_CACHE_SIZE = _env_int("ANALYSIS_CACHE_SIZE", 512)
+ANALYSIS_CACHE_TTL = _env_int("ANALYSIS_CACHE_TTL", 7 * 24 * 3600)
+# Directory for the persistent tier; empty keeps the cache in memory only
+ANALYSIS_CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", ".cache/analysis")
+ANALYSIS_CACHE_MAX_DISK_ENTRIES = _env_int("ANALYSIS_CACHE_MAX_DISK_ENTRIES", 5000)
+# Width of a confidence band in percentage points; the prompt states the band midpoint
+ANALYSIS_CONFIDENCE_BUCKET = _env_float("ANALYSIS_CONFIDENCE_BUCKET", 5)
+# Upper bounds of the age bands, e.g. "2,12,18,65" -> 0-2, 3-12, 13-18, 19-65, 66+
+ANALYSIS_AGE_BUCKETS = [
+    int(a) for a in os.environ.get("ANALYSIS_AGE_BUCKETS", "2,12,18,65").split(",") if a.strip().isdigit()
+]
+
+# -------------------- Doctor Chatbot --------------------
+
+# Stream replies token by token and stop the model after four sentences
+CHAT_STREAMING = os.environ.get("CHAT_STREAMING", "1").lower() not in ("0", "false", "no")
+
+# Estimated tokens of history (summary + verbatim turns) sent per chat turn
+CHAT_MEMORY_TOKEN_BUDGET = _env_int("CHAT_MEMORY_TOKEN_BUDGET", 1000)
+# Most recent turns that are always kept word for word
+CHAT_MEMORY_KEEP_TURNS = _env_int("CHAT_MEMORY_KEEP_TURNS", 4)
+
+# Reply cache for repeated questions about the same scan context
+CHAT_CACHE_SIZE = _env_int("CHAT_CACHE_SIZE", 2048)
+# Minimum trigram cosine similarity for a near-duplicate question to hit
+CHAT_CACHE_SIMILARITY = _env_float("CHAT_CACHE_SIMILARITY", 0.85)
+
+# -------------------- Background Jobs --------------------
+
+# Worker threads shared by all sessions (analysis, box rendering, chat warm-up, reports)
+JOB_MAX_WORKERS = _env_int("JOB_MAX_WORKERS", 8)
+# Seconds a finished job's result stays available (and reusable by identical jobs)
+JOB_RESULT_TTL = _env_int("JOB_RESULT_TTL", 600)
+# Seconds between UI status polls while a job is running
+JOB_POLL_INTERVAL = _env_float("JOB_POLL_INTERVAL", 0.5)
+
+# -------------------- Box Rendering --------------------
+
+# Opacity of the class-coloured fill inside each box; 0 draws outlines only
+BOX_FILL_ALPHA = _env_float("BOX_FILL_ALPHA", 0.15)
+# Longest image side at which boxes use the base 2px line and 0.5 text scale
+BOX_REFERENCE_SIDE = _env_int("BOX_REFERENCE_SIDE", 1280)
+# Above this many boxes fills and labels overlap into noise; draw outlines only
+BOX_DENSE_LIMIT = _env_int("BOX_DENSE_LIMIT", 200)
+
+# -------------------- Metrics --------------------
+
+# Per-stage latency histograms and error counters; 0 makes every span a no-op
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+# Histogram bucket upper bounds in seconds (comma-separated)
+METRICS_BUCKETS = _env_floats("METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30")
+# Port for the Streamlit process's Prometheus exporter (0 = off; the API serves /metrics)
+METRICS_PORT = _env_int("METRICS_PORT", 0)
+# Shows the admin metrics panel when the app is opened with ?admin=<token>
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# -------------------- Rerun Timer --------------------
+
+# Show server time and bytes sent per interaction (sidebar + fragment captions)
+RERUN_TIMER = os.environ.get("RERUN_TIMER", "0").lower() not in ("0", "false", "no")
+# Measured runs kept in the session log
+RERUN_TIMER_HISTORY = _env_int("RERUN_TIMER_HISTORY", 30)
+
+# -------------------- Charts --------------------
+
+# Distinct chart_data sets whose Plotly JSON specs stay cached (shared by all sessions)
+CHART_CACHE_SIZE = _env_int("CHART_CACHE_SIZE", 128)
+
+# -------------------- PDF Reports --------------------
+
+# Finished PDFs kept in memory, keyed by report data and scan image
+REPORT_CACHE_SIZE = _env_int("REPORT_CACHE_SIZE", 64)
+# Longest side and JPEG quality of the annotated scan embedded in the PDF
+REPORT_IMAGE_MAX_SIDE = _env_int("REPORT_IMAGE_MAX_SIDE", 1024)
+REPORT_IMAGE_JPEG_QUALITY = _env_int("REPORT_IMAGE_JPEG_QUALITY", 80)
+
+# -------------------- Detection Backend --------------------
+
+# Which backend run_detection dispatches to: "roboflow", "onnx" or "stub"
+DETECTION_BACKEND = os.environ.get("DETECTION_BACKEND", "roboflow")
+
+# -------------------- Roboflow Workflow --------------------
+
+ROBOFLOW_WORKSPACE = os.environ.get("ROBOFLOW_WORKSPACE", "privacydetailsdetection")
+ROBOFLOW_WORKFLOW_ID = os.environ.get("ROBOFLOW_WORKFLOW_ID", "custom-workflow-5")
+ROBOFLOW_MODEL_VERSION = os.environ.get("ROBOFLOW_MODEL_VERSION", "1")
+
+# How images reach the workflow client: "memory" (base64 JPEG) or "file"
+DETECTION_TRANSPORT = os.environ.get("DETECTION_TRANSPORT", "memory")
+
+# JPEG quality used when encoding uploads (75 matches PIL's default)
+DETECTION_JPEG_QUALITY = _env_int("DETECTION_JPEG_QUALITY", 75)
+
+# Longest image side sent for detection; 0 uploads at full resolution
+DETECTION_MAX_SIDE = _env_int("DETECTION_MAX_SIDE", 1280)
+
+# -------------------- ONNX Runtime Backend --------------------
+
+ONNX_MODEL_PATH = os.environ.get("ONNX_MODEL_PATH", "")
+# Comma-separated; falls back to the model's "names" metadata
+ONNX_CLASS_NAMES = [c.strip() for c in os.environ.get("ONNX_CLASS_NAMES", "").split(",") if c.strip()]
+ONNX_CONFIDENCE = _env_float("ONNX_CONFIDENCE", 0.4)
+ONNX_IOU_THRESHOLD = _env_float("ONNX_IOU_THRESHOLD", 0.5)
+ONNX_INPUT_SIZE = _env_int("ONNX_INPUT_SIZE", 640)
+
+# -------------------- Detection Cache --------------------
+
+# Number of detection results kept in memory per process
+DETECTION_CACHE_SIZE = _env_int("DETECTION_CACHE_SIZE", 256)
+
+# Optional directory for the on-disk tier; empty disables it
+DETECTION_CACHE_DIR = os.environ.get("DETECTION_CACHE_DIR", "")
+
+# Upper bound on concurrent Roboflow requests per batch
+DETECTION_MAX_CONCURRENCY = _env_int("DETECTION_MAX_CONCURRENCY", 4)
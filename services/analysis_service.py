@@ -3,26 +3,156 @@ Gemini Analysis Service
 Handles clinical analysis, insights, and chart data generation
 """
 
-import streamlit as st
-import google.generativeai as genai
+import copy
 import json
-import re
+import logging
+import math
 
-from config.api_config import get_gemini_api_key
-from config.prompts import get_analysis_prompt
-from utils.parser_utils import parse_gemini_response
+from config.api_config import get_gemini_model
+from config.settings import (
+    GEMINI_MODEL,
+    ANALYSIS_OUTPUT_MODE,
+    ANALYSIS_CACHE_SIZE,
+    ANALYSIS_CACHE_TTL,
+    ANALYSIS_CACHE_DIR,
+    ANALYSIS_CACHE_MAX_DISK_ENTRIES,
+    ANALYSIS_CONFIDENCE_BUCKET,
+    ANALYSIS_AGE_BUCKETS,
+)
+from config.prompts import (
+    get_analysis_prompt,
+    get_structured_analysis_prompt,
+    ANALYSIS_RESPONSE_SCHEMA,
+)
+from services.errors import ServiceError, ANALYSIS_FAILED
+from utils.cache_utils import TieredCache, hash_key
+from utils.metrics import span, timed_stage
+from utils.parser_utils import (
+    parse_gemini_response,
+    parse_structured_response,
+    IncrementalAnalysisParser,
+)
 
+ANALYSIS_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 2500
+}
 
-# -------------------- Gemini Analysis Core --------------------
+DEFAULT_VISUAL_FEATURES = ["Redness detected", "Inflammation visible", "Structural changes"]
 
-def get_advanced_gemini_response(
-    detected_condition,
-    confidence,
-    patient_age=None,
-    visual_features=None
-):
-    """Get comprehensive medical analysis from Gemini (SAFE & CLOUD-COMPATIBLE)"""
+logger = logging.getLogger(__name__)
+
+
+# -------------------- Analysis Cache --------------------
+
+def _prompt_version():
+    """Hash of the rendered template, model, generation settings and bands"""
+    if ANALYSIS_OUTPUT_MODE == "json":
+        template = get_structured_analysis_prompt("{condition}", 0.0, "{age}", ["{features}"])
+        template += json.dumps(ANALYSIS_RESPONSE_SCHEMA, sort_keys=True)
+    else:
+        template = get_analysis_prompt("{condition}", 0.0, "{age}", ["{features}"])
+    return hash_key(
+        ANALYSIS_OUTPUT_MODE,
+        template,
+        GEMINI_MODEL,
+        json.dumps(ANALYSIS_GENERATION_CONFIG, sort_keys=True),
+        # The prompt states the bands, so resizing them changes the prose
+        repr(ANALYSIS_CONFIDENCE_BUCKET),
+        repr(ANALYSIS_AGE_BUCKETS)
+    )[:16]
+
+
+PROMPT_VERSION = _prompt_version()
+
+_analysis_cache = TieredCache(
+    ANALYSIS_CACHE_SIZE,
+    ANALYSIS_CACHE_DIR or None,
+    ttl=ANALYSIS_CACHE_TTL,
+    max_disk_entries=ANALYSIS_CACHE_MAX_DISK_ENTRIES
+)
+
+
+def _confidence_band(confidence, width):
+    # 100% belongs to the top band rather than a band of its own
+    low = min(math.floor(confidence / width) * width, 100 - width)
+    return low, low + width
+
+
+def confidence_bucket(confidence, width=ANALYSIS_CONFIDENCE_BUCKET):
+    """Lower edge of the confidence band, e.g. 91.7 -> '90-95'"""
+    low, high = _confidence_band(confidence, width)
+    return f"{low:g}-{high:g}"
+
+
+def age_bucket(patient_age, bounds=ANALYSIS_AGE_BUCKETS):
+    try:
+        age = int(patient_age)
+    except (TypeError, ValueError):
+        return "unknown"
+    if age <= 0:
+        return "unknown"
+    lower = 0
+    for upper in bounds:
+        if age <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def banded_prompt_inputs(confidence, patient_age):
+    """Confidence and age as the prompt states them: the band, not the scan.
+
+    Cached prose is shared by every scan in the same bands, so it must be
+    written for the band rather than for one patient's exact values.
+    """
+    low, high = _confidence_band(confidence, ANALYSIS_CONFIDENCE_BUCKET)
+    age = age_bucket(patient_age)
+    return (low + high) / 2, (f"{age} years" if age != "unknown" else None)
+
+
+def analysis_cache_key(detected_condition, confidence, patient_age, visual_features):
+    return hash_key(
+        detected_condition.strip().lower(),
+        confidence_bucket(confidence),
+        age_bucket(patient_age),
+        "|".join(visual_features),
+        PROMPT_VERSION
+    )
 
+
+def analysis_cache_stats():
+    """Hit/miss counters for the analysis cache"""
+    return _analysis_cache.stats()
+
+
+def _show_scan_confidence(analysis, confidence):
+    """Chart the scan's own confidence; the prompt only saw its band"""
+    detection = analysis.get('chart_data', {}).get('detection_confidence')
+    if isinstance(detection, dict):
+        detection['confidence_percent'] = round(confidence, 2)
+    return analysis
+
+
+def _cached_analysis(cache_key, confidence):
+    cached = _analysis_cache.get(cache_key)
+    if cached is None:
+        return None
+
+    # Copy so callers cannot mutate the shared entry
+    return _show_scan_confidence(copy.deepcopy(cached), confidence)
+
+
+def _store_analysis(cache_key, analysis):
+    # Chart JSON comes last, so its presence marks a complete (not truncated) response
+    if analysis.get('overview') and analysis.get('chart_data'):
+        _analysis_cache.set(cache_key, analysis)
+
+
+# -------------------- Gemini Analysis Core --------------------
+
+def _build_analysis_prompt(detected_condition, confidence, patient_age, visual_features,
+                           prompt_builder=get_analysis_prompt):
     if patient_age is None:
         patient_age = "Not provided"
 
@@ -33,56 +163,203 @@ def get_advanced_gemini_response(
             "Structural abnormalities"
         ]
 
-    prompt = get_analysis_prompt(
+    return prompt_builder(
         detected_condition,
         confidence,
         patient_age,
         visual_features
     )
 
+
+@timed_stage("gemini_analysis")
+def get_advanced_gemini_response(
+    detected_condition,
+    confidence,
+    patient_age=None,
+    visual_features=None
+):
+    """Get comprehensive medical analysis from Gemini.
+
+    Returns the response text (None if empty); raises ``ServiceError``
+    when the request fails.
+    """
+
+    prompt = _build_analysis_prompt(detected_condition, confidence, patient_age, visual_features)
+
     try:
-        # ✅ Correct Gemini SDK usage
-        genai.configure(api_key=get_gemini_api_key())
+        # Shared model: configured once per process, channel kept open
+        model = get_gemini_model(GEMINI_MODEL)
 
-        model = genai.GenerativeModel("gemini-3-flash-preview")
+        response = model.generate_content(
+            prompt,
+            generation_config=ANALYSIS_GENERATION_CONFIG
+        )
+
+        return response.text if response and response.text else None
+
+    except ServiceError:
+        raise
+    except Exception as e:
+        logger.exception("Gemini analysis request failed")
+        raise ServiceError(ANALYSIS_FAILED, f"Analysis Error: {e}", retryable=True) from e
+
+
+@timed_stage("gemini_analysis")
+def get_structured_gemini_response(
+    detected_condition,
+    confidence,
+    patient_age=None,
+    visual_features=None
+):
+    """Get the analysis as schema-constrained JSON text"""
+
+    prompt = _build_analysis_prompt(
+        detected_condition, confidence, patient_age, visual_features,
+        prompt_builder=get_structured_analysis_prompt
+    )
+
+    try:
+        model = get_gemini_model(GEMINI_MODEL)
 
         response = model.generate_content(
             prompt,
             generation_config={
-                "temperature": 0.7,
-                "max_output_tokens": 2500
+                **ANALYSIS_GENERATION_CONFIG,
+                "response_mime_type": "application/json",
+                "response_schema": ANALYSIS_RESPONSE_SCHEMA
             }
         )
 
         return response.text if response and response.text else None
 
+    except ServiceError:
+        raise
     except Exception as e:
-        st.error(f"Analysis Error: {str(e)}")
-        return None
+        logger.exception("Gemini analysis request failed")
+        raise ServiceError(ANALYSIS_FAILED, f"Analysis Error: {e}", retryable=True) from e
+
+
+def stream_gemini_response(
+    detected_condition,
+    confidence,
+    patient_age=None,
+    visual_features=None
+):
+    """Yield the Gemini analysis text chunk by chunk as it is generated"""
+
+    prompt = _build_analysis_prompt(detected_condition, confidence, patient_age, visual_features)
+
+    try:
+        model = get_gemini_model(GEMINI_MODEL)
+
+        # Timed from request to last chunk, like the non-streaming call
+        with span("gemini_analysis_stream"):
+            response = model.generate_content(
+                prompt,
+                generation_config=ANALYSIS_GENERATION_CONFIG,
+                stream=True
+            )
+
+            for chunk in response:
+                text = getattr(chunk, "text", "")
+                if text:
+                    yield text
+
+    except ServiceError:
+        raise
+    except Exception as e:
+        logger.exception("Gemini analysis stream failed")
+        raise ServiceError(ANALYSIS_FAILED, f"Analysis Error: {e}", retryable=True) from e
 
 
 # -------------------- Detection → Analysis Wrapper --------------------
 
+def _analysis_inputs(predictions):
+    return predictions[0]["class"], predictions[0]["confidence"] * 100
+
+
 def analyze_detection(predictions, patient_age):
     """Analyze detection results and return parsed analysis + chart data"""
 
     if not predictions:
         return {}, {}
 
-    detected_condition = predictions[0]["class"]
-    confidence = predictions[0]["confidence"] * 100
+    detected_condition, confidence = _analysis_inputs(predictions)
+    cache_key = analysis_cache_key(detected_condition, confidence, patient_age, DEFAULT_VISUAL_FEATURES)
+
+    cached = _cached_analysis(cache_key, confidence)
+    if cached is not None:
+        return cached, cached.get("chart_data", {})
+
+    band_confidence, band_age = banded_prompt_inputs(confidence, patient_age)
+
+    if ANALYSIS_OUTPUT_MODE == "json":
+        try:
+            analysis = parse_structured_response(
+                get_structured_gemini_response(
+                    detected_condition,
+                    band_confidence,
+                    band_age,
+                    DEFAULT_VISUAL_FEATURES
+                ),
+                ANALYSIS_RESPONSE_SCHEMA
+            )
+        except ServiceError as e:
+            logger.warning("Structured analysis failed, falling back to text: %s", e)
+            analysis = None
+        if analysis is not None:
+            _store_analysis(cache_key, _show_scan_confidence(analysis, confidence))
+            return analysis, analysis["chart_data"]
 
     response_text = get_advanced_gemini_response(
         detected_condition,
-        confidence,
-        patient_age,
-        ["Redness detected", "Inflammation visible", "Structural changes"]
+        band_confidence,
+        band_age,
+        DEFAULT_VISUAL_FEATURES
     )
 
     if not response_text:
         return {}, {}
 
-    analysis = parse_gemini_response(response_text)
+    analysis = _show_scan_confidence(parse_gemini_response(response_text), confidence)
     chart_data = analysis.get("chart_data", {})
+    _store_analysis(cache_key, analysis)
 
     return analysis, chart_data
+
+
+def stream_analysis(predictions, patient_age):
+    """Stream the analysis, yielding ``(section_name, analysis)`` as sections complete.
+
+    ``analysis`` is the same dict on every yield and holds every section
+    parsed so far; after the generator is exhausted it is the full result.
+    """
+
+    if not predictions:
+        return
+
+    detected_condition, confidence = _analysis_inputs(predictions)
+    cache_key = analysis_cache_key(detected_condition, confidence, patient_age, DEFAULT_VISUAL_FEATURES)
+
+    cached = _cached_analysis(cache_key, confidence)
+    if cached is not None:
+        for section in cached:
+            yield section, cached
+        return
+
+    parser = IncrementalAnalysisParser()
+    band_confidence, band_age = banded_prompt_inputs(confidence, patient_age)
+
+    for chunk in stream_gemini_response(
+        detected_condition,
+        band_confidence,
+        band_age,
+        DEFAULT_VISUAL_FEATURES
+    ):
+        for section in parser.feed(chunk):
+            yield section, parser.sections
+
+    for section in parser.finish():
+        yield section, parser.sections
+
+    _store_analysis(cache_key, _show_scan_confidence(parser.sections, confidence))
@@ -0,0 +1,227 @@
+"""Batch Report Service
+
+Headless detection → analysis → PDF pipeline over a directory of images,
+used by ``batch_cli.py``. Progress is appended to a JSONL checkpoint so
+an interrupted run resumes where it stopped.
+"""
+import csv
+import io
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from services.detection_service import run_detection, upload_key
+from services.analysis_service import analyze_detection
+from services.report_service import generate_pdf_bytes
+from utils.image_utils import load_image, process_detection_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+STAGES = ("load", "detect", "analyze", "render", "report")
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+SUMMARY_FILE = "summary.json"
+
+
+def list_images(image_dir):
+    return sorted(
+        name for name in os.listdir(image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(image_dir, name))
+    )
+
+
+def load_patients(csv_path):
+    """Patient rows keyed by the ``image`` column (file name)"""
+    if not csv_path:
+        return {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if "image" not in (reader.fieldnames or ()):
+            raise ValueError(f"{csv_path}: patients CSV has no 'image' column")
+        return {row["image"].strip(): row for row in reader if row.get("image")}
+
+
+def _load_upload(image_path):
+    """Decoded image plus the ``upload_key`` of its file"""
+    with open(image_path, "rb") as f:
+        data = f.read()
+    return load_image(io.BytesIO(data)), upload_key(data)
+
+
+def _patient_age(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_report_data(image_name, patient, predictions, analysis):
+    """Same report layout as the Generate Report tab"""
+    stem = os.path.splitext(image_name)[0]
+    return {
+        'report_id': f"RPT-{stem}",
+        'report_date': datetime.now().strftime("%B %d, %Y at %I:%M %p"),
+        'patient': {
+            'id': patient.get('patient_id') or stem,
+            'name': patient.get('name') or "Not provided",
+            'age': patient.get('age') or "Not provided",
+            'gender': patient.get('gender') or "Not provided"
+        },
+        'detection': {
+            'infections': [
+                {
+                    'name': p['class'],
+                    'confidence': f"{p['confidence']*100:.2f}%"
+                }
+                for p in predictions
+            ]
+        },
+        'analysis': analysis,
+        'doctor_notes': patient.get('notes') or "None provided"
+    }
+
+
+# ---- Checkpoint ----
+
+class Checkpoint:
+    """Append-only JSONL record of finished images"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def completed(self):
+        """Image names whose last record is a success"""
+        done = {}
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut off by an interrupted write
+                done[record["image"]] = record["status"] == "done"
+        return {name for name, ok in done.items() if ok}
+
+    def append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+# ---- Per-image Pipeline ----
+
+def process_one(image_path, patient, output_dir):
+    """Run one image through every stage; returns a checkpoint record"""
+    image_name = os.path.basename(image_path)
+    timings = {}
+    record = {'image': image_name, 'status': "done", 'timings': timings}
+
+    def timed(stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage] = time.perf_counter() - started
+
+    try:
+        image, image_key = timed("load", _load_upload, image_path)
+        predictions = timed("detect", run_detection, image, image_key=image_key)
+
+        analysis = {}
+        if predictions:
+            analysis, _ = timed("analyze", analyze_detection, predictions, _patient_age(patient.get('age')))
+            record['analysis'] = bool(analysis)
+        processed_image = timed("render", process_detection_image, image, predictions) if predictions else None
+
+        report_data = build_report_data(image_name, patient, predictions, analysis)
+        pdf = timed("report", generate_pdf_bytes, report_data, processed_image)
+
+        pdf_path = os.path.join(output_dir, f"{os.path.splitext(image_name)[0]}.pdf")
+        with open(f"{pdf_path}.tmp", "wb") as f:
+            f.write(pdf)
+        os.replace(f"{pdf_path}.tmp", pdf_path)
+
+        record['pdf'] = pdf_path
+        record['findings'] = [p['class'] for p in predictions]
+        if predictions and not analysis:
+            # The PDF is kept, but a resumed run retries the image
+            record['status'] = "failed"
+            record['error'] = "clinical analysis returned no result"
+    except Exception as e:
+        record['status'] = "failed"
+        record['error'] = str(e)
+
+    return record
+
+
+# ---- Batch Run ----
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(records, wall_time, skipped):
+    """Throughput and per-stage latency (seconds) for one run"""
+    processed = [r for r in records if r['status'] == "done"]
+    stages = {}
+    for stage in STAGES:
+        values = [r['timings'][stage] for r in records if stage in r['timings']]
+        if values:
+            stages[stage] = {
+                'count': len(values),
+                'mean': statistics.fmean(values),
+                'p50': _percentile(values, 50),
+                'p95': _percentile(values, 95),
+                'max': max(values),
+            }
+    return {
+        'processed': len(processed),
+        'failed': len(records) - len(processed),
+        'skipped': skipped,
+        'wall_time': wall_time,
+        'images_per_second': len(records) / wall_time if wall_time else 0.0,
+        'stages': stages,
+    }
+
+
+def run_batch(image_dir, output_dir, patients_csv=None, concurrency=4, resume=True, on_record=None):
+    """Process every image in ``image_dir`` and write one PDF per image.
+
+    With ``resume`` images already recorded as done in the checkpoint are
+    skipped. ``on_record`` is called with each checkpoint record as it is
+    written. Returns the run summary (also saved as ``summary.json``).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_FILE))
+    patients = load_patients(patients_csv)
+
+    images = list_images(image_dir)
+    completed = checkpoint.completed() if resume else set()
+    todo = [name for name in images if name not in completed]
+
+    def work(name):
+        record = process_one(os.path.join(image_dir, name), patients.get(name, {}), output_dir)
+        checkpoint.append(record)
+        if on_record is not None:
+            on_record(record)
+        return record
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+        records = list(pool.map(work, todo))
+    wall_time = time.perf_counter() - started
+
+    summary = summarize(records, wall_time, skipped=len(images) - len(todo))
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
@@ -0,0 +1,128 @@
+"""Chat Response Cache
+
+Reuses Dr. Chen's answers for repeated questions about the same scan.
+Entries are scoped to a hash of the medical context string; lookups try
+the normalized question first, then the most similar cached question
+(cosine similarity over character trigrams). A similar question only
+hits when it has the same numbers and negations. Callers only use it for
+the first turn of a conversation, whose reply cannot depend on history.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from utils.cache_utils import hash_key
+
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_CONTRACTION = re.compile(r"(\w)n t\b")  # "don t" after normalizing "don't"
+
+NEGATIONS = frozenset({
+    "no", "not", "never", "none", "nothing", "without", "cannot", "cant",
+    "dont", "doesnt", "didnt", "isnt", "arent", "wasnt", "shouldnt", "wont",
+})
+
+
+def normalize_question(question):
+    """Lower-case, drop punctuation and collapse whitespace"""
+    return _NON_WORD.sub(" ", question.lower()).strip()
+
+
+def _meaning_markers(text):
+    """Numbers and negation words, which trigram similarity barely sees"""
+    words = _CONTRACTION.sub(r"\1nt", text).split()
+    return tuple(_NUMBER.findall(text)), frozenset(w for w in words if w in NEGATIONS)
+
+
+def _trigram_vector(text, n=3):
+    padded = f"  {text} "
+    grams = Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+    norm = math.sqrt(sum(c * c for c in grams.values()))
+    return grams, norm
+
+
+def _cosine(a, b):
+    vec_a, norm_a = a
+    vec_b, norm_b = b
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    return sum(c * vec_b.get(g, 0) for g, c in vec_a.items()) / (norm_a * norm_b)
+
+
+class ChatResponseCache:
+    """LRU cache of replies with a per-context similarity index"""
+
+    def __init__(self, maxsize=1024, threshold=0.85):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._entries = OrderedDict()  # (context, question) -> (vector, markers, reply)
+        self._by_context = {}          # context -> set of questions
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get(self, medical_context_str, question):
+        """Cached reply or None"""
+        context = hash_key(medical_context_str)
+        normalized = normalize_question(question)
+        key = (context, normalized)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[2]
+
+            vector = _trigram_vector(normalized)
+            markers = _meaning_markers(normalized)
+            best_key, best_score = None, self.threshold
+            for candidate in self._by_context.get(context, ()):
+                candidate_vector, candidate_markers, _ = self._entries[(context, candidate)]
+                if candidate_markers != markers:
+                    continue
+                score = _cosine(vector, candidate_vector)
+                if score >= best_score:
+                    best_key, best_score = (context, candidate), score
+
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                return self._entries[best_key][2]
+
+            self.misses += 1
+            return None
+
+    def set(self, medical_context_str, question, reply):
+        if self.maxsize <= 0:
+            return
+        context = hash_key(medical_context_str)
+        normalized = normalize_question(question)
+        key = (context, normalized)
+
+        with self._lock:
+            self._entries[key] = (_trigram_vector(normalized), _meaning_markers(normalized), reply)
+            self._entries.move_to_end(key)
+            self._by_context.setdefault(context, set()).add(normalized)
+
+            while len(self._entries) > self.maxsize:
+                (old_context, old_question), _ = self._entries.popitem(last=False)
+                questions = self._by_context.get(old_context)
+                if questions is not None:
+                    questions.discard(old_question)
+                    if not questions:
+                        del self._by_context[old_context]
+
+    def stats(self):
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
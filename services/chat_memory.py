@@ -0,0 +1,84 @@
+"""Bounded Conversation Memory
+
+Keeps the chatbot prompt a roughly constant size: the last turns stay
+verbatim and older turns are folded into a running summary once a
+local token estimate exceeds the budget.
+"""
+import re
+
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain.prompts import PromptTemplate
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string
+
+from config.prompts import CHAT_SUMMARY_PROMPT_TEMPLATE
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+CHAT_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["summary", "new_lines"],
+    template=CHAT_SUMMARY_PROMPT_TEMPLATE
+)
+
+
+def count_tokens(text):
+    """Cheap local token estimate (no API call).
+
+    Counts words and punctuation, but never less than one token per four
+    characters, which tracks SentencePiece/BPE counts closely enough for
+    budgeting.
+    """
+    if not text:
+        return 0
+    return max(len(text) // 4, len(_TOKEN_PATTERN.findall(text)))
+
+
+class BoundedConversationMemory(ConversationSummaryBufferMemory):
+    """Summary buffer memory with a local token counter and a verbatim tail"""
+
+    keep_last_turns: int = 4
+    prompt: PromptTemplate = CHAT_SUMMARY_PROMPT
+
+    def _buffer_tokens(self, messages):
+        return count_tokens(get_buffer_string(
+            messages,
+            human_prefix=self.human_prefix,
+            ai_prefix=self.ai_prefix
+        ))
+
+    def prompt_tokens(self):
+        """Estimated tokens this memory adds to the next prompt"""
+        return self._buffer_tokens(self.chat_memory.messages) + count_tokens(self.moving_summary_buffer)
+
+    def prune(self):
+        """Fold the oldest turns into the summary once over budget"""
+        if self.prompt_tokens() <= self.max_token_limit:
+            return
+
+        buffer = self.chat_memory.messages
+        summary_tokens = count_tokens(self.moving_summary_buffer)
+        keep_messages = max(1, self.keep_last_turns) * 2
+
+        pruned = []
+        # First drop everything older than the verbatim tail, then keep going
+        # (down to the latest turn) only if the tail alone is over budget
+        while len(buffer) > keep_messages:
+            pruned.extend(buffer[:2])
+            del buffer[:2]
+        while len(buffer) > 2 and self._buffer_tokens(buffer) + summary_tokens > self.max_token_limit:
+            pruned.extend(buffer[:2])
+            del buffer[:2]
+
+        if pruned:
+            self.moving_summary_buffer = self.predict_new_summary(pruned, self.moving_summary_buffer)
+
+    def load_history(self, turns):
+        """Replace the buffer with earlier ``(question, reply)`` turns.
+
+        Prunes once, so a long history costs at most one summary call
+        instead of one per turn.
+        """
+        messages = []
+        for question, reply in turns:
+            messages.extend([HumanMessage(content=question), AIMessage(content=reply)])
+        self.chat_memory.messages = messages
+        self.prune()
@@ -1,12 +1,24 @@
-import streamlit as st
 import asyncio
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from config.api_config import get_gemini_api_key
+import logging
+from config.api_config import get_chat_llm
 from config.prompts import ENT_DOCTOR_SYSTEM_PROMPT
-from utils.parser_utils import format_doctor_reply
+from config.settings import (
+    CHAT_MEMORY_TOKEN_BUDGET,
+    CHAT_MEMORY_KEEP_TURNS,
+    CHAT_CACHE_SIZE,
+    CHAT_CACHE_SIMILARITY,
+)
+from services.chat_cache import ChatResponseCache
+from services.errors import ServiceError, CHAT_UNAVAILABLE
+from utils.metrics import span
+from utils.parser_utils import format_doctor_reply, DoctorReplyStream
+
+DOCTOR_UNAVAILABLE_MESSAGE = "⚠️ The AI doctor is temporarily unavailable. Please try again."
+
+# Shared by all sessions; entries are scoped to the medical context string
+_reply_cache = ChatResponseCache(CHAT_CACHE_SIZE, CHAT_CACHE_SIMILARITY)
+
+logger = logging.getLogger(__name__)
 
 
 # ------------------ FIX EVENT LOOP (CRITICAL) ------------------
@@ -36,21 +48,30 @@ Visual Indicators: {', '.join(medical_context.get('visual_features', []))}
 # ------------------ Initialize Chatbot ------------------
 
 def initialize_langchain_chatbot(medical_context_str):
+    """Build a session's chatbot around the shared LLM client.
+
+    Called by the post-detection warm-up (or on the first chat message);
+    only the memory, prompt and chain wrapper are created per session.
+    LangChain itself is imported here, on first use.
+    """
     try:
-        ensure_event_loop()  # 🔥 REQUIRED FIX
+        from langchain.chains import ConversationChain
+        from langchain.prompts import PromptTemplate
+        from services.chat_memory import BoundedConversationMemory
 
-        api_key = get_gemini_api_key()
+        ensure_event_loop()  # 🔥 REQUIRED FIX
 
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-3-flash-preview",
-            google_api_key=api_key,
-            temperature=0.7,
-            max_output_tokens=1200
-        )
+        llm = get_chat_llm()
 
-        memory = ConversationBufferMemory(
+        # History is rendered as "Patient: / Dr. Chen:" lines and kept
+        # within a token budget; older turns become a running summary
+        memory = BoundedConversationMemory(
+            llm=llm,
             memory_key="chat_history",
-            return_messages=True
+            max_token_limit=CHAT_MEMORY_TOKEN_BUDGET,
+            keep_last_turns=CHAT_MEMORY_KEEP_TURNS,
+            human_prefix="Patient",
+            ai_prefix="Dr. Chen"
         )
 
         prompt = PromptTemplate(
@@ -83,17 +104,129 @@ Dr. Chen:
             verbose=False
         )
 
+    except ServiceError:
+        raise
     except Exception as e:
-        st.exception(e)
-        return None
+        logger.exception("Could not build the doctor chatbot")
+        raise ServiceError(CHAT_UNAVAILABLE, DOCTOR_UNAVAILABLE_MESSAGE, retryable=True) from e
+
+
+def replay_history(chatbot, chat_history):
+    """Load earlier ``{'role', 'content'}`` turns into a fresh chatbot's memory"""
+    turns = []
+    question = None
+    for msg in chat_history:
+        if msg['role'] == 'user':
+            question = msg['content']
+        elif question is not None:
+            turns.append((question, msg['content']))
+            question = None
+    chatbot.memory.load_history(turns)
+    return chatbot
 
 
 # ------------------ Get Response ------------------
 
 def get_chatbot_response(chatbot, user_question):
     try:
-        response = chatbot.predict(input=user_question)
+        with span("chat"):
+            response = chatbot.predict(input=user_question)
         return format_doctor_reply(response)
     except Exception as e:
-        st.exception(e)
-        return "⚠️ The AI doctor is temporarily unavailable. Please try again."
+        logger.exception("Doctor chatbot request failed")
+        raise ServiceError(CHAT_UNAVAILABLE, DOCTOR_UNAVAILABLE_MESSAGE, retryable=True) from e
+
+
+
+def stream_chatbot_response(chatbot, user_question, max_sentences=4):
+    """Yield the reply as it streams; stops the model after ``max_sentences``.
+
+    Each yielded value is the text so far; the last one is the formatted
+    reply, which is also saved to the chatbot's memory.
+    """
+    reply = DoctorReplyStream(max_sentences)
+    try:
+        prompt = chatbot.prompt.format(
+            input=user_question,
+            **chatbot.memory.load_memory_variables({"input": user_question})
+        )
+
+        tokens = chatbot.llm.stream(prompt)
+        try:
+            with span("chat_stream"):
+                for chunk in tokens:
+                    limit_reached = reply.feed(getattr(chunk, "content", chunk) or "")
+                    yield reply.text
+                    if limit_reached:
+                        break
+        finally:
+            # Closing the iterator cancels the upstream generation
+            tokens.close()
+
+        final_reply = reply.reply()
+        chatbot.memory.save_context({"input": user_question}, {"response": final_reply})
+        yield final_reply
+
+    except Exception as e:
+        logger.exception("Doctor chatbot stream failed")
+        raise ServiceError(CHAT_UNAVAILABLE, DOCTOR_UNAVAILABLE_MESSAGE, retryable=True) from e
+
+
+
+# ------------------ Stateless Turn ------------------
+
+def answer_question(medical_context, user_question, chat_history=()):
+    """Answer one question without server-side session state.
+
+    The chatbot is rebuilt around the shared LLM and ``chat_history`` is
+    replayed into its memory, so any worker can serve any turn. Returns
+    ``(reply, cached)``.
+    """
+    medical_context_str = get_medical_context_string(medical_context)
+    chatbot = replay_history(initialize_langchain_chatbot(medical_context_str), chat_history)
+
+    reply = get_cached_reply(chatbot, medical_context_str, user_question)
+    if reply is not None:
+        return reply, True
+
+    reply = get_chatbot_response(chatbot, user_question)
+    cache_reply(chatbot, medical_context_str, user_question, reply)
+    return reply, False
+
+
+# ------------------ Reply Cache ------------------
+
+def _history_turns(chatbot):
+    """Turns in the chatbot's memory, counting a summary as one"""
+    if chatbot is None:
+        return 0
+    memory = chatbot.memory
+    return len(memory.chat_memory.messages) // 2 + bool(memory.moving_summary_buffer)
+
+
+def get_cached_reply(chatbot, medical_context_str, user_question):
+    """Return a cached reply for this scan context, or None.
+
+    Only the first question of a conversation is looked up: later replies
+    depend on earlier turns. On a hit the turn is still written to the
+    chatbot's memory so later questions keep their conversational context.
+    """
+    if _history_turns(chatbot):
+        return None
+    reply = _reply_cache.get(medical_context_str, user_question)
+    if reply is not None and chatbot is not None:
+        chatbot.memory.save_context({"input": user_question}, {"response": reply})
+    return reply
+
+
+def cache_reply(chatbot, medical_context_str, user_question, reply):
+    """Cache a reply once it is in memory, if it answered the first question"""
+    if _history_turns(chatbot) > 1:
+        return
+    if reply and reply != DOCTOR_UNAVAILABLE_MESSAGE:
+        _reply_cache.set(medical_context_str, user_question, reply)
+
+
+def chat_cache_stats():
+    """Exact/similar hit counts and hit rate of the reply cache"""
+    return _reply_cache.stats()
@@ -0,0 +1,233 @@
+"""Detection Backends
+
+Every backend takes a prepared RGB PIL image and returns predictions as
+dicts with ``x``, ``y`` (box centre), ``width``, ``height``, ``class`` and
+``confidence`` in that image's pixel coordinates.
+"""
+import ast
+import hashlib
+import threading
+
+import numpy as np
+
+from config.api_config import get_roboflow_client
+from config.settings import (
+    ROBOFLOW_WORKSPACE,
+    ROBOFLOW_WORKFLOW_ID,
+    ROBOFLOW_MODEL_VERSION,
+    DETECTION_BACKEND,
+    DETECTION_TRANSPORT,
+    DETECTION_JPEG_QUALITY,
+    ONNX_MODEL_PATH,
+    ONNX_CLASS_NAMES,
+    ONNX_CONFIDENCE,
+    ONNX_IOU_THRESHOLD,
+    ONNX_INPUT_SIZE,
+)
+from services.errors import ServiceError, CONFIG_ERROR
+from utils.image_utils import encode_image_base64, temporary_image_file
+
+
+class DetectionBackend:
+    """Base class for detection backends"""
+
+    name = "base"
+
+    def cache_identity(self):
+        """Strings that distinguish this backend's results in the cache"""
+        return (self.name,)
+
+    def detect(self, image):
+        raise NotImplementedError
+
+
+# -------------------- Roboflow Workflow --------------------
+
+class RoboflowWorkflowBackend(DetectionBackend):
+    """Hosted Roboflow workflow (the original detection path)"""
+
+    name = "roboflow"
+
+    def __init__(self, workspace=ROBOFLOW_WORKSPACE, workflow_id=ROBOFLOW_WORKFLOW_ID,
+                 model_version=ROBOFLOW_MODEL_VERSION):
+        self.workspace = workspace
+        self.workflow_id = workflow_id
+        self.model_version = model_version
+
+    def cache_identity(self):
+        return (self.name, self.workspace, self.workflow_id, self.model_version)
+
+    def _run_workflow(self, client, image_reference):
+        # The SDK passes base64 strings through untouched, so the JPEG is encoded once
+        return client.run_workflow(
+            workspace_name=self.workspace,
+            workflow_id=self.workflow_id,
+            images={"image": image_reference},
+            use_cache=True
+        )
+
+    def detect(self, image):
+        client = get_roboflow_client()
+
+        if DETECTION_TRANSPORT == "file":
+            with temporary_image_file(image, DETECTION_JPEG_QUALITY) as temp_file_path:
+                result = self._run_workflow(client, temp_file_path)
+        else:
+            result = self._run_workflow(client, encode_image_base64(image, DETECTION_JPEG_QUALITY))
+
+        predictions = []
+        if isinstance(result, list) and len(result) > 0:
+            for item in result:
+                if isinstance(item, dict) and "predictions" in item:
+                    pred_data = item["predictions"]
+                    if isinstance(pred_data, dict) and "predictions" in pred_data:
+                        predictions.extend(pred_data["predictions"])
+        return predictions
+
+
+# -------------------- ONNX Runtime (CPU) --------------------
+
+_onnx_sessions = {}
+_onnx_lock = threading.Lock()
+
+
+def _load_onnx_session(model_path):
+    """Load an ONNX model once per process and share the session"""
+    with _onnx_lock:
+        if model_path not in _onnx_sessions:
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                raise ServiceError(CONFIG_ERROR, "onnxruntime is not installed; run `pip install onnxruntime`")
+            _onnx_sessions[model_path] = ort.InferenceSession(
+                model_path, providers=["CPUExecutionProvider"]
+            )
+        return _onnx_sessions[model_path]
+
+
+class OnnxRuntimeBackend(DetectionBackend):
+    """Local CPU inference on a YOLO-style export (output ``[1, 4 + classes, boxes]``)"""
+
+    name = "onnx"
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, class_names=ONNX_CLASS_NAMES,
+                 confidence=ONNX_CONFIDENCE, iou_threshold=ONNX_IOU_THRESHOLD,
+                 input_size=ONNX_INPUT_SIZE):
+        if not model_path:
+            raise ServiceError(CONFIG_ERROR, "ONNX_MODEL_PATH is not set")
+        self.model_path = model_path
+        self.session = _load_onnx_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+        self.class_names = list(class_names) or self._model_class_names()
+        self.confidence = confidence
+        self.iou_threshold = iou_threshold
+        self.input_size = input_size
+
+    def cache_identity(self):
+        return (self.name, self.model_path, str(self.confidence))
+
+    def _model_class_names(self):
+        # Ultralytics stores {id: name} as a string in the custom metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if not names:
+            return []
+        try:
+            parsed = ast.literal_eval(names)
+        except (ValueError, SyntaxError):
+            return []
+        return [parsed[k] for k in sorted(parsed)] if isinstance(parsed, dict) else list(parsed)
+
+    def _letterbox(self, image):
+        size = self.input_size
+        ratio = min(size / image.width, size / image.height)
+        new_w, new_h = round(image.width * ratio), round(image.height * ratio)
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = np.asarray(image.resize((new_w, new_h)))
+        tensor = canvas.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        return tensor, ratio, pad_x, pad_y
+
+    def detect(self, image):
+        import cv2
+
+        tensor, ratio, pad_x, pad_y = self._letterbox(image)
+        output = self.session.run(None, {self.input_name: tensor})[0][0]
+        rows = output.T  # (boxes, 4 + classes)
+
+        scores = rows[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(rows)), class_ids]
+        keep = confidences >= self.confidence
+        rows, class_ids, confidences = rows[keep], class_ids[keep], confidences[keep]
+        if not len(rows):
+            return []
+
+        cx = (rows[:, 0] - pad_x) / ratio
+        cy = (rows[:, 1] - pad_y) / ratio
+        w = rows[:, 2] / ratio
+        h = rows[:, 3] / ratio
+
+        boxes = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1).tolist()
+        indices = cv2.dnn.NMSBoxes(boxes, confidences.tolist(), self.confidence, self.iou_threshold)
+
+        predictions = []
+        for i in np.array(indices).flatten():
+            class_id = int(class_ids[i])
+            predictions.append({
+                'x': float(cx[i]),
+                'y': float(cy[i]),
+                'width': float(w[i]),
+                'height': float(h[i]),
+                'class': self.class_names[class_id] if class_id < len(self.class_names) else str(class_id),
+                'class_id': class_id,
+                'confidence': float(confidences[i]),
+            })
+        predictions.sort(key=lambda p: p['confidence'], reverse=True)
+        return predictions
+
+
+# -------------------- Deterministic Stub --------------------
+
+class StubBackend(DetectionBackend):
+    """Offline backend whose output depends only on the image content"""
+
+    name = "stub"
+    classes = ("Acute Otitis Media", "Otitis Externa", "Earwax Blockage", "Normal")
+
+    def detect(self, image):
+        digest = hashlib.sha256(image.tobytes()).digest()
+        width, height = image.size
+        box_w = width * (0.2 + digest[0] / 255 * 0.3)
+        box_h = height * (0.2 + digest[1] / 255 * 0.3)
+        return [{
+            'x': width * (0.35 + digest[2] / 255 * 0.3),
+            'y': height * (0.35 + digest[3] / 255 * 0.3),
+            'width': box_w,
+            'height': box_h,
+            'class': self.classes[digest[4] % len(self.classes)],
+            'class_id': digest[4] % len(self.classes),
+            'confidence': round(0.5 + digest[5] / 255 * 0.49, 4),
+        }]
+
+
+# -------------------- Registry --------------------
+
+BACKENDS = {
+    RoboflowWorkflowBackend.name: RoboflowWorkflowBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    StubBackend.name: StubBackend,
+}
+
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def get_detection_backend(name=None):
+    """Return the process-wide backend instance for ``name``"""
+    name = name or DETECTION_BACKEND
+    if name not in BACKENDS:
+        raise ServiceError(CONFIG_ERROR, f"Unknown detection backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = BACKENDS[name]()
+        return _backend_instances[name]
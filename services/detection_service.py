@@ -1,41 +1,137 @@
-"""Roboflow Detection Service"""
-import tempfile
-from config.api_config import get_roboflow_client
-from utils.image_utils import process_detection_image
-
-def run_detection(uploaded_image):
-    """Run Roboflow detection on uploaded image"""
-    client = get_roboflow_client()
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-        uploaded_image.save(temp_file.name)
-        temp_file_path = temp_file.name
-    
-    result = client.run_workflow(
-        workspace_name="privacydetailsdetection",
-        workflow_id="custom-workflow-5",
-        images={"image": temp_file_path},
-        use_cache=True
+"""Detection Service"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import (
+    DETECTION_MAX_SIDE,
+    DETECTION_CACHE_SIZE,
+    DETECTION_CACHE_DIR,
+    DETECTION_MAX_CONCURRENCY,
+)
+from services.detection_backends import get_detection_backend
+from services.errors import ServiceError, DETECTION_FAILED
+from utils.cache_utils import TieredCache, hash_key
+from utils.image_utils import prepare_upload_image, scale_predictions
+from utils.metrics import span, timed_stage
+
+# Results keyed by image content + backend identity, shared across sessions
+_detection_cache = TieredCache(DETECTION_CACHE_SIZE, DETECTION_CACHE_DIR or None)
+
+logger = logging.getLogger(__name__)
+
+
+def upload_key(data):
+    """Cache identity of an encoded upload (the file bytes ``load_image`` decodes)"""
+    return hash_key(data)
+
+
+def detection_cache_key(uploaded_image, backend, image_key=None):
+    """Content hash of the image plus the backend identity.
+
+    ``image_key`` (see ``upload_key``) stands in for the pixels, which are
+    only hashed when it is missing.
+    """
+    if image_key is not None:
+        content = ("upload", image_key)
+    else:
+        rgb_image = uploaded_image if uploaded_image.mode == "RGB" else uploaded_image.convert("RGB")
+        content = (rgb_image.tobytes(),)
+    return hash_key(
+        f"{uploaded_image.width}x{uploaded_image.height}",
+        *content,
+        *backend.cache_identity(),
+        str(DETECTION_MAX_SIDE),
     )
 
-    predictions = []
-    if isinstance(result, list) and len(result) > 0:
-        for item in result:
-            if isinstance(item, dict) and "predictions" in item:
-                pred_data = item["predictions"]
-                if isinstance(pred_data, dict) and "predictions" in pred_data:
-                    predictions.extend(pred_data["predictions"])
-    
+
+def detection_cache_stats():
+    """Hit/miss counters for the detection cache"""
+    return _detection_cache.stats()
+
+
+@timed_stage("detection")
+def run_detection(uploaded_image, use_cache=True, backend=None, image_key=None):
+    """Run detection on uploaded image through the configured backend"""
+    if backend is None or isinstance(backend, str):
+        backend = get_detection_backend(backend)
+
+    cache_key = detection_cache_key(uploaded_image, backend, image_key) if use_cache else None
+    if cache_key:
+        cached = _detection_cache.get(cache_key)
+        if cached is not None:
+            return [dict(p) for p in cached]
+
+    upload_image, scale = prepare_upload_image(uploaded_image, DETECTION_MAX_SIDE)
+    try:
+        with span("detection_backend"):
+            predictions = backend.detect(upload_image)
+    except ServiceError:
+        raise
+    except Exception as e:
+        logger.exception("Detection failed on backend %s", backend.name)
+        raise ServiceError(DETECTION_FAILED, str(e), retryable=True) from e
+
+    # Boxes come back in upload coordinates; drawing and box_area use the original
+    predictions = scale_predictions(predictions, scale)
+
+    if cache_key:
+        _detection_cache.set(cache_key, predictions)
+
     return predictions
 
+
+def _timed_detection(index, image, backend=None, image_key=None):
+    started = time.perf_counter()
+    try:
+        predictions, error = run_detection(image, backend=backend, image_key=image_key), None
+    except Exception as e:
+        predictions, error = [], str(e)
+    return {
+        'index': index,
+        'predictions': predictions,
+        'error': error,
+        'latency': time.perf_counter() - started
+    }
+
+
+def run_detection_batch(images, max_concurrency=DETECTION_MAX_CONCURRENCY, backend=None, image_keys=None):
+    """Run detection on several images concurrently.
+
+    Returns one result per image, in input order, with its predictions,
+    error message (or None) and latency in seconds. A failure on one
+    image does not affect the others. ``image_keys`` are the images'
+    ``upload_key`` values, if known.
+    """
+    images = list(images)
+    if not images:
+        return []
+    if image_keys is None or len(image_keys) != len(images):
+        image_keys = [None] * len(images)
+
+    workers = max(1, min(max_concurrency, len(images)))
+    if workers == 1:
+        return [_timed_detection(i, image, backend, key) for i, (image, key) in enumerate(zip(images, image_keys))]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detection") as pool:
+        return list(pool.map(_timed_detection, range(len(images)), images, [backend] * len(images), image_keys))
+
+
+def select_primary_result(results):
+    """Pick the result whose top prediction is most confident"""
+    successful = [r for r in results if r['predictions']]
+    if not successful:
+        return None
+    return max(successful, key=lambda r: r['predictions'][0]['confidence'])
+
+
 def build_medical_context(predictions, patient_age):
     """Build medical context from predictions"""
     if not predictions:
         return {}
-    
+
     confidence = predictions[0]['confidence'] * 100
     conf_label = "high" if confidence > 85 else "moderate" if confidence > 60 else "low"
-    
+
     return {
         'condition': predictions[0]['class'],
         'confidence': confidence,
@@ -0,0 +1,26 @@
+"""Service Errors
+
+The service layer never talks to the UI. Failures are raised as
+``ServiceError`` with a machine-readable code; the Streamlit app, the
+batch CLI and the HTTP API each decide how to present them.
+"""
+
+CONFIG_ERROR = "config_error"
+INVALID_INPUT = "invalid_input"
+DETECTION_FAILED = "detection_failed"
+ANALYSIS_FAILED = "analysis_failed"
+CHAT_UNAVAILABLE = "chat_unavailable"
+REPORT_FAILED = "report_failed"
+
+
+class ServiceError(Exception):
+    """Structured service failure"""
+
+    def __init__(self, code, message, retryable=False):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.retryable = retryable
+
+    def to_dict(self):
+        return {"code": self.code, "message": self.message, "retryable": self.retryable}
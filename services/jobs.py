@@ -0,0 +1,205 @@
+"""Background Jobs
+
+Process-wide queue for slow work (Gemini analysis, PDF reports) that has
+to survive Streamlit reruns. A job submitted with the same ``key`` as one
+that is queued, running or recently done shares that job instead of
+running again; failed and cancelled jobs are retried. The UI keeps only
+job IDs in session state and polls their status from fragments.
+
+Only keyed jobs stay in the queue after they finish, for dedup and
+lookup by ID; an unkeyed job's result lives only as long as the caller's
+``Job`` handle.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import JOB_MAX_WORKERS, JOB_RESULT_TTL
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once its job has been cancelled"""
+
+
+class Job:
+    """One unit of background work and its outcome"""
+
+    def __init__(self, kind, key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.progress = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 1
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def reusable(self):
+        """Whether a new submit with the same key may share this job"""
+        return self.status not in (FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def report(self, progress):
+        """Publish a partial result; raises ``JobCancelled`` after cancellation"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.id)
+        self.progress = progress
+
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def wait(self, timeout=None):
+        """Block until the job finishes and return its result (None unless done)"""
+        if self.future is not None and not self.future.cancelled():
+            self.future.result(timeout)
+        return self.result if self.status == DONE else None
+
+
+class JobQueue:
+    """Thread pool plus job bookkeeping (status, results, dedup, cancellation)"""
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS, result_ttl=JOB_RESULT_TTL):
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def _prune(self):
+        # Finished keyed jobs stay readable (and reusable) for result_ttl seconds
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get((job.kind, job.key)) == job_id:
+                    del self._by_key[(job.kind, job.key)]
+
+    def submit(self, kind, fn, *args, key=None, progress=False, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` and return its ``Job``.
+
+        With ``progress=True`` the function also receives ``progress=``,
+        a callback that publishes partial results and raises
+        ``JobCancelled`` once the job is cancelled.
+        """
+        with self._lock:
+            self._prune()
+
+            if key is not None:
+                existing = self._jobs.get(self._by_key.get((kind, key)))
+                if existing is not None and existing.reusable:
+                    existing.subscribers += 1
+                    return existing
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[(kind, key)] = job.id
+            if progress:
+                kwargs["progress"] = job.report
+            job.future = self._get_executor().submit(self._run, job, fn, args, kwargs)
+            return job
+
+    def _forget_unkeyed(self, job):
+        # Nothing can look an unkeyed job up again, so the queue lets it go
+        if job.key is None:
+            self._jobs.pop(job.id, None)
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            with self._lock:
+                self._forget_unkeyed(job)
+            return None
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._forget_unkeyed(job)
+        return job.result
+
+    def get(self, job_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Withdraw one subscriber; the job stops once nobody is waiting for it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return False
+
+            job._cancel_event.set()
+            if job.future.cancel():
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._forget_unkeyed(job)
+            return True
+
+    def stats(self):
+        """Number of tracked jobs per status"""
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+
+_queue = JobQueue()
+
+
+def submit_job(kind, fn, *args, key=None, progress=False, **kwargs):
+    return _queue.submit(kind, fn, *args, key=key, progress=progress, **kwargs)
+
+
+def get_job(job_id):
+    return _queue.get(job_id)
+
+
+def cancel_job(job_id):
+    return _queue.cancel(job_id)
+
+
+def job_stats():
+    return _queue.stats()
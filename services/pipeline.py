@@ -0,0 +1,139 @@
+"""Post-Detection Pipeline
+
+Once predictions arrive, box rendering, clinical analysis and the chatbot
+warm-up are submitted as background jobs and run concurrently. The
+pipeline object lives in session state and only holds job handles, so
+reruns never restart work; the UI polls it and renders each stage as it
+resolves.
+"""
+from config.settings import ANALYSIS_STREAMING, ANALYSIS_OUTPUT_MODE
+from services.analysis_service import analyze_detection, stream_analysis
+from services.chatbot_service import initialize_langchain_chatbot, get_medical_context_string
+from services.errors import ServiceError, ANALYSIS_FAILED
+from services.jobs import submit_job, cancel_job, DONE
+from utils.cache_utils import hash_key
+from utils.image_utils import process_detection_image
+
+
+def boxes_key(index):
+    return f"boxes:{index}"
+
+
+def run_analysis(predictions, patient_age, streaming, progress):
+    """Analysis job; streamed sections are published as ``(sections, analysis)``.
+
+    An analysis with no content fails the job, so the same key is retried
+    instead of sharing the empty result.
+    """
+    if streaming:
+        sections = []
+        analysis = {}
+        for section, analysis in stream_analysis(predictions, patient_age):
+            sections.append(section)
+            progress((list(sections), analysis))
+        chart_data = analysis.get('chart_data', {})
+    else:
+        analysis, chart_data = analyze_detection(predictions, patient_age)
+
+    if not any(value for section, value in analysis.items() if section != 'chart_data'):
+        raise ServiceError(ANALYSIS_FAILED, "Clinical analysis came back empty. Please run detection again.",
+                           retryable=True)
+    return analysis, chart_data
+
+
+def analysis_job_key(predictions, patient_age, streaming):
+    """Identical inputs share one analysis job across sessions"""
+    top = predictions[0]
+    return hash_key(top['class'], repr(top['confidence']), str(patient_age), str(streaming))
+
+
+class PostDetectionPipeline:
+    """Background stages that follow a detection run.
+
+    Stage keys are ``boxes:<image index>``, ``analysis`` and ``chatbot``.
+    """
+
+    def __init__(self, images, results, predictions, medical_context, patient_age):
+        self.images = images
+        self.results = results
+        self.predictions = predictions
+        self.medical_context = medical_context
+        self.patient_age = patient_age
+        self.streaming = ANALYSIS_STREAMING and ANALYSIS_OUTPUT_MODE == "text"
+        self.jobs = {}
+
+    def start(self):
+        # Analysis first: it is the slowest stage and should not queue behind the others
+        if self.predictions:
+            self.jobs['analysis'] = submit_job(
+                "analysis", run_analysis, self.predictions, self.patient_age, self.streaming,
+                key=analysis_job_key(self.predictions, self.patient_age, self.streaming),
+                progress=True
+            )
+            # Memory is per session, so the chatbot is never shared
+            self.jobs['chatbot'] = submit_job(
+                "chatbot", initialize_langchain_chatbot, get_medical_context_string(self.medical_context)
+            )
+        for r in self.results:
+            if r['predictions']:
+                self.jobs[boxes_key(r['index'])] = submit_job(
+                    "boxes", process_detection_image, self.images[r['index']], r['predictions']
+                )
+        return self
+
+    # ---- Status ----
+
+    def done(self, key=None):
+        if key is not None:
+            job = self.jobs.get(key)
+            return job is not None and job.finished
+        return all(job.finished for job in self.jobs.values())
+
+    def pending(self, prefix=""):
+        """Whether any stage whose key starts with ``prefix`` is still running"""
+        return any(not job.finished for key, job in self.jobs.items() if key.startswith(prefix))
+
+    def result(self, key, timeout=None):
+        """Result of a stage (waiting up to ``timeout``), or None if it failed"""
+        job = self.jobs.get(key)
+        if job is None:
+            return None
+        return job.wait(timeout)
+
+    def job_id(self, key):
+        """ID of a stage's job (a stable name for its result), or None"""
+        job = self.jobs.get(key)
+        return job.id if job is not None else None
+
+    def analysis_progress(self):
+        """``(completed sections, analysis so far)`` while the analysis streams"""
+        job = self.jobs.get('analysis')
+        if job is None or job.progress is None:
+            return [], {}
+        return job.progress
+
+    def error(self, key):
+        job = self.jobs.get(key)
+        return job.error if job is not None else None
+
+    def cancel(self):
+        """Release every unfinished stage (e.g. when a new detection begins)"""
+        for job in self.jobs.values():
+            if not job.finished:
+                cancel_job(job.id)
+
+    def timings(self):
+        return {key: job.duration() for key, job in self.jobs.items() if job.status == DONE}
+
+    def elapsed(self):
+        jobs = [job for job in self.jobs.values() if job.started_at is not None]
+        if not jobs:
+            return 0.0
+        started = min(job.created_at for job in jobs)
+        finished = max(job.finished_at or job.started_at for job in jobs)
+        return finished - started
+
+
+def start_post_detection(images, results, predictions, medical_context, patient_age):
+    """Create and start the pipeline for a finished detection batch"""
+    return PostDetectionPipeline(images, results, predictions, medical_context, patient_age).start()
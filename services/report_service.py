@@ -1,42 +1,106 @@
 """PDF Report Generation Service"""
 import io
+import json
+import logging
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as ReportImage
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER
 
-def generate_pdf_report(report_data, processed_image=None):
-    """Generate PDF report"""
+from config.settings import REPORT_CACHE_SIZE, REPORT_IMAGE_MAX_SIDE, REPORT_IMAGE_JPEG_QUALITY
+from services.errors import ServiceError, REPORT_FAILED
+from utils.cache_utils import LRUCache, hash_key
+from utils.image_utils import encode_jpeg, prepare_upload_image
+from utils.metrics import timed_stage
+
+# ---- Styles (built once per process) ----
+
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1f77b4'),
+    spaceAfter=30,
+    alignment=TA_CENTER
+)
+
+PATIENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f4f8')),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('PADDING', (0, 0), (-1, -1), 8),
+])
+
+DISCLAIMER = ("This AI-generated report is for clinical support only. "
+              "It does NOT provide a medical diagnosis. "
+              "Consult a qualified ENT specialist for confirmation.")
+
+# Largest area the annotated scan may take on the page
+IMAGE_MAX_WIDTH = 6 * inch
+IMAGE_MAX_HEIGHT = 4 * inch
+
+# Finished PDFs keyed by report_key(); repeated clicks and downloads reuse them
+_pdf_cache = LRUCache(REPORT_CACHE_SIZE)
+
+logger = logging.getLogger(__name__)
+
+
+def report_key(report_data, processed_image=None, image_key=None):
+    """Stable hash of everything that ends up in the PDF.
+
+    ``image_key`` names the annotated scan (e.g. its boxes job ID) so its
+    pixels need not be hashed; without it the pixels are.
+    """
+    if image_key is None:
+        image_key = processed_image.tobytes() if processed_image is not None else b""
+    return hash_key(
+        json.dumps(report_data, sort_keys=True, default=str),
+        image_key,
+        str(REPORT_IMAGE_MAX_SIDE),
+        str(REPORT_IMAGE_JPEG_QUALITY)
+    )
+
+
+def report_cache_stats():
+    return {"hits": _pdf_cache.hits, "misses": _pdf_cache.misses, "size": len(_pdf_cache)}
+
+
+def _scan_image(processed_image, max_side, quality):
+    """Downscaled JPEG copy of the annotated scan, sized to fit the page"""
+    image, _ = prepare_upload_image(processed_image, max_side)
+    # JPEG bytes are embedded as-is (DCT) instead of being re-encoded losslessly
+    flowable = ReportImage(io.BytesIO(encode_jpeg(image, quality)))
+    ratio = min(IMAGE_MAX_WIDTH / image.width, IMAGE_MAX_HEIGHT / image.height)
+    flowable.drawWidth = image.width * ratio
+    flowable.drawHeight = image.height * ratio
+    return flowable
+
+
+def render_pdf(report_data, processed_image=None,
+               max_side=REPORT_IMAGE_MAX_SIDE, quality=REPORT_IMAGE_JPEG_QUALITY):
+    """Build the PDF and return its bytes (uncached)"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, 
                            rightMargin=72, leftMargin=72,
                            topMargin=72, bottomMargin=18)
     
     elements = []
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1f77b4'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
     
     # Title
-    elements.append(Paragraph("AI-ASSISTED EAR INFECTION DETECTION REPORT", title_style))
+    elements.append(Paragraph("AI-ASSISTED EAR INFECTION DETECTION REPORT", TITLE_STYLE))
     elements.append(Spacer(1, 0.2*inch))
     
     # Report metadata
-    elements.append(Paragraph(f"<b>Report Generated:</b> {report_data['report_date']}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Report ID:</b> {report_data.get('report_id', 'N/A')}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Report Generated:</b> {report_data['report_date']}", STYLES['Normal']))
+    elements.append(Paragraph(f"<b>Report ID:</b> {report_data.get('report_id', 'N/A')}", STYLES['Normal']))
     elements.append(Spacer(1, 0.3*inch))
     
     # Patient Information
-    elements.append(Paragraph("<b>PATIENT INFORMATION</b>", styles['Heading2']))
+    elements.append(Paragraph("<b>PATIENT INFORMATION</b>", STYLES['Heading2']))
     patient_data = [
         ['Patient ID:', report_data['patient']['id']],
         ['Name:', report_data['patient']['name']],
@@ -44,44 +108,61 @@ def generate_pdf_report(report_data, processed_image=None):
         ['Gender:', report_data['patient']['gender']],
     ]
     patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f4f8')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    patient_table.setStyle(PATIENT_TABLE_STYLE)
     elements.append(patient_table)
     elements.append(Spacer(1, 0.3*inch))
     
     # Detection Results
-    elements.append(Paragraph("<b>DETECTION RESULTS</b>", styles['Heading2']))
+    elements.append(Paragraph("<b>DETECTION RESULTS</b>", STYLES['Heading2']))
     for infection in report_data['detection']['infections']:
         elements.append(Paragraph(
             f"• <b>{infection['name']}</b> - Confidence: {infection['confidence']}", 
-            styles['Normal']
+            STYLES['Normal']
         ))
     elements.append(Spacer(1, 0.3*inch))
     
+    # Annotated scan
+    if processed_image is not None:
+        elements.append(Paragraph("<b>ANNOTATED SCAN</b>", STYLES['Heading2']))
+        elements.append(_scan_image(processed_image, max_side, quality))
+        elements.append(Spacer(1, 0.3*inch))
+    
     # Analysis sections
     analysis = report_data['analysis']
     
     if analysis.get('overview'):
-        elements.append(Paragraph("<b>CLINICAL OVERVIEW</b>", styles['Heading2']))
-        elements.append(Paragraph(analysis['overview'], styles['Normal']))
+        elements.append(Paragraph("<b>CLINICAL OVERVIEW</b>", STYLES['Heading2']))
+        elements.append(Paragraph(analysis['overview'], STYLES['Normal']))
         elements.append(Spacer(1, 0.2*inch))
     
     if analysis.get('severity'):
-        elements.append(Paragraph("<b>SEVERITY ASSESSMENT</b>", styles['Heading2']))
-        elements.append(Paragraph(analysis['severity'], styles['Normal']))
+        elements.append(Paragraph("<b>SEVERITY ASSESSMENT</b>", STYLES['Heading2']))
+        elements.append(Paragraph(analysis['severity'], STYLES['Normal']))
         elements.append(Spacer(1, 0.2*inch))
     
     # Disclaimer
     elements.append(Spacer(1, 0.3*inch))
-    disclaimer = ("This AI-generated report is for clinical support only. "
-                 "It does NOT provide a medical diagnosis. "
-                 "Consult a qualified ENT specialist for confirmation.")
-    elements.append(Paragraph(f"<b>{disclaimer}</b>", styles['Normal']))
+    elements.append(Paragraph(f"<b>{DISCLAIMER}</b>", STYLES['Normal']))
     
     doc.build(elements)
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer.getvalue()
+
+
+@timed_stage("report")
+def generate_pdf_bytes(report_data, processed_image=None, image_key=None):
+    """Finished PDF as immutable bytes, served from the cache when unchanged"""
+    cache_key = report_key(report_data, processed_image, image_key)
+    pdf = _pdf_cache.get(cache_key)
+    if pdf is None:
+        try:
+            pdf = render_pdf(report_data, processed_image)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.exception("Could not render the PDF report")
+            raise ServiceError(REPORT_FAILED, f"Invalid report data: {e}") from e
+        _pdf_cache.set(cache_key, pdf)
+    return pdf
+
+
+def generate_pdf_report(report_data, processed_image=None):
+    """Generate PDF report"""
+    return io.BytesIO(generate_pdf_bytes(report_data, processed_image))
@@ -0,0 +1,98 @@
+"""Clinical Analysis Rendering"""
+import streamlit as st
+
+from ui.visualizations import create_visualizations
+
+# Display order in Tab 1; streamed sections fill these slots as they complete
+ANALYSIS_DISPLAY_ORDER = [
+    'overview',
+    'severity',
+    'chart_data',
+    'symptoms',
+    'prevention',
+    'red_flags',
+    'disclaimer'
+]
+
+
+def render_charts(chart_data):
+    """Render the Plotly analytics grid"""
+    if not chart_data:
+        return
+
+    st.markdown("#### 📈 Visual Analytics")
+
+    charts = create_visualizations(chart_data)
+
+    if 'confidence' in charts:
+        st.plotly_chart(charts['confidence'], use_container_width=True, key="conf_chart")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if 'symptoms' in charts:
+            st.plotly_chart(charts['symptoms'], use_container_width=True, key="symp_chart")
+    with col2:
+        if 'timeline' in charts:
+            st.plotly_chart(charts['timeline'], use_container_width=True, key="time_chart")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        if 'features' in charts:
+            st.plotly_chart(charts['features'], use_container_width=True, key="feat_chart")
+    with col4:
+        if 'prevention' in charts:
+            st.plotly_chart(charts['prevention'], use_container_width=True, key="prev_chart")
+
+
+def render_analysis_section(section, analysis, confidence):
+    """Render one analysis section; sections with no content render nothing"""
+    if section == 'chart_data':
+        render_charts(analysis.get('chart_data'))
+
+    elif section == 'overview' and analysis.get('overview'):
+        st.markdown("#### 📋 Overview")
+        st.info(analysis['overview'])
+
+    elif section == 'severity' and analysis.get('severity'):
+        st.markdown("#### ⚠️ Severity Assessment")
+        if confidence < 60:
+            st.success(analysis['severity'])
+        elif confidence < 85:
+            st.warning(analysis['severity'])
+        else:
+            st.error(analysis['severity'])
+
+    elif section == 'symptoms' and analysis.get('symptoms'):
+        with st.expander("🩺 Probable Symptoms", expanded=False):
+            for symptom in analysis['symptoms']:
+                st.markdown(f"• {symptom}")
+
+    elif section == 'prevention' and analysis.get('prevention'):
+        with st.expander("🛡️ Prevention & Care Guidance", expanded=False):
+            for prev in analysis['prevention']:
+                st.markdown(f"• {prev}")
+
+    elif section == 'red_flags' and analysis.get('red_flags'):
+        with st.expander("🚨 Red-Flag Alerts", expanded=False):
+            st.error("Seek immediate medical attention if you experience:")
+            for flag in analysis['red_flags']:
+                st.markdown(f"• {flag}")
+
+    elif section == 'disclaimer' and analysis.get('disclaimer'):
+        st.markdown("---")
+        st.caption(analysis['disclaimer'])
+
+
+def render_analysis(analysis, confidence):
+    """Render a complete analysis in display order"""
+    for section in ANALYSIS_DISPLAY_ORDER:
+        render_analysis_section(section, analysis, confidence)
+
+
+def render_partial_analysis(sections, analysis, confidence):
+    """Render the completed sections of an analysis that is still being generated"""
+    for section in ANALYSIS_DISPLAY_ORDER:
+        if section in sections:
+            render_analysis_section(section, analysis, confidence)
+    st.caption("⏳ Generating clinical insights...")
+
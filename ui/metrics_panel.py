@@ -0,0 +1,73 @@
+"""Admin Metrics Panel
+
+Stage latency histograms, error counts and cache/job counters for this
+server process. Only rendered when the app is opened with
+``?admin=<ADMIN_TOKEN>``.
+"""
+import hmac
+
+import streamlit as st
+
+from config.settings import ADMIN_TOKEN, METRICS_ENABLED
+from utils.metrics import metrics_snapshot, prometheus_text
+
+
+def is_admin():
+    token = st.query_params.get("admin", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _stage_rows(stages):
+    return [
+        {
+            "stage": stage,
+            "count": s['count'],
+            "mean ms": round(s['mean'] * 1000, 1),
+            "p50 ms": round(s['p50'] * 1000, 1),
+            "p95 ms": round(s['p95'] * 1000, 1),
+            "p99 ms": round(s['p99'] * 1000, 1),
+            "max ms": round(s['max'] * 1000, 1),
+            "errors": ", ".join(f"{code} ×{n}" for code, n in s['errors'].items()),
+        }
+        for stage, s in stages.items()
+    ]
+
+
+def _counters():
+    # Imported here so the panel never adds to the app's startup cost
+    from services.detection_service import detection_cache_stats
+    from services.analysis_service import analysis_cache_stats
+    from services.chatbot_service import chat_cache_stats
+    from services.report_service import report_cache_stats
+    from services.jobs import job_stats
+    from ui.visualizations import chart_cache_stats
+
+    return {
+        "jobs": job_stats(),
+        "detection cache": detection_cache_stats(),
+        "analysis cache": analysis_cache_stats(),
+        "chat cache": chat_cache_stats(),
+        "report cache": report_cache_stats(),
+        "chart cache": chart_cache_stats(),
+    }
+
+
+def render_metrics_panel():
+    """Latency table, counters and a Prometheus snapshot (admins only)"""
+    if not is_admin():
+        return
+
+    with st.expander("📈 Stage metrics (admin)", expanded=False):
+        if not METRICS_ENABLED:
+            st.caption("Instrumentation is off (METRICS_ENABLED=0).")
+            return
+
+        stages = metrics_snapshot()
+        if stages:
+            st.dataframe(_stage_rows(stages), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No stage has run in this process yet.")
+
+        st.json(_counters(), expanded=False)
+        st.download_button("Prometheus snapshot", prometheus_text(), file_name="metrics.prom",
+                           mime="text/plain", use_container_width=True)
@@ -0,0 +1,91 @@
+"""Rerun Timer
+
+Measures what each interaction costs on the server: wall time of the
+script (or fragment) run and the size of the messages sent to the
+browser for it. ``st.image`` sends a media URL rather than the pixels,
+so image bytes are not counted, but their encoding time is.
+
+Enabled with ``RERUN_TIMER=1``; otherwise every call is a no-op.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config.settings import RERUN_TIMER, RERUN_TIMER_HISTORY
+
+_local = threading.local()
+
+
+@contextmanager
+def rerun_timer(scope):
+    """Record server time and message bytes of the enclosed run under ``scope``"""
+    ctx = get_script_run_ctx() if RERUN_TIMER else None
+    if ctx is None:
+        yield
+        return
+
+    sent = 0
+    # ScriptRunContext._enqueue is private Streamlit API; it is only wrapped
+    # while RERUN_TIMER is on and may need updating on Streamlit upgrades
+    enqueue = ctx._enqueue
+
+    def counting_enqueue(msg):
+        nonlocal sent
+        sent += msg.ByteSize()
+        enqueue(msg)
+
+    # Runs inside an outer measured run (a fragment during a full rerun)
+    # are kept for comparison but are not interactions of their own
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    ctx._enqueue = counting_enqueue
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        ctx._enqueue = enqueue
+        _local.depth = depth
+        log = st.session_state.setdefault("rerun_log", [])
+        log.append({'scope': scope, 'ms': elapsed * 1000, 'bytes': sent, 'nested': depth > 0})
+        del log[:-RERUN_TIMER_HISTORY]
+
+
+def timed(scope):
+    """Decorator: measure every call of a fragment (or any render function)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with rerun_timer(scope):
+                result = fn(*args, **kwargs)
+            render_rerun_caption(scope)
+            return result
+        return wrapper
+    return decorator
+
+
+def _format_entry(entry):
+    return f"{entry['scope']} · {entry['ms']:.0f} ms · {entry['bytes'] / 1024:.1f} KiB"
+
+
+def render_rerun_caption(scope):
+    """Cost of the latest run of ``scope``"""
+    if not RERUN_TIMER:
+        return
+    runs = [e for e in st.session_state.get("rerun_log", []) if e['scope'] == scope]
+    if runs:
+        st.caption(f"⏱️ {_format_entry(runs[-1])}")
+
+
+def render_rerun_log():
+    """Recent interactions and per-fragment costs, newest first"""
+    if not RERUN_TIMER:
+        return
+    with st.expander("⏱️ Rerun timer", expanded=False):
+        for entry in reversed(st.session_state.get("rerun_log", [])):
+            prefix = "  ↳ " if entry['nested'] else ""
+            st.text(prefix + _format_entry(entry))
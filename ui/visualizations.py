@@ -1,14 +1,57 @@
-"""Visualization Components"""
+"""Visualization Components
+
+Figures are built once per distinct ``chart_data`` and Plotly template
+and cached as JSON specs. The strings are immutable, so every session
+shares them, and reruns only re-inflate the specs instead of rebuilding
+and re-validating each figure.
+"""
+import json
+
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
 
+from config.settings import CHART_CACHE_SIZE
+from utils.cache_utils import LRUCache, hash_key
+
+_spec_cache = LRUCache(CHART_CACHE_SIZE)
+
+
+def chart_key(chart_data):
+    """Stable key for chart data under the active Plotly template"""
+    return hash_key(json.dumps(chart_data, sort_keys=True, default=str), str(pio.templates.default))
+
+
+def chart_cache_stats():
+    return {"hits": _spec_cache.hits, "misses": _spec_cache.misses, "size": len(_spec_cache)}
+
+
+def chart_specs(chart_data):
+    """Plotly JSON spec per chart name, built on the first request only"""
+    if not chart_data:
+        return {}
+
+    key = chart_key(chart_data)
+    specs = _spec_cache.get(key)
+    if specs is None:
+        charts, complete = build_figures(chart_data)
+        specs = {name: fig.to_json() for name, fig in charts.items()}
+        # A partial set is retried on the next rerun rather than pinned
+        if complete:
+            _spec_cache.set(key, specs)
+    return specs
+
+
 def create_visualizations(chart_data):
     """Create interactive Plotly charts"""
+    # Specs come from validated figures, so skip Plotly's validation pass
+    return {name: go.Figure(json.loads(spec), _validate=False) for name, spec in chart_specs(chart_data).items()}
+
+
+def build_figures(chart_data):
+    """Build every chart from scratch; returns ``(charts, complete)``"""
     charts = {}
     
-    if not chart_data:
-        return charts
-    
     try:
         # Confidence Gauge
         if 'detection_confidence' in chart_data:
@@ -118,5 +161,6 @@ def create_visualizations(chart_data):
             
     except Exception as e:
         st.warning(f"Could not generate all visualizations: {str(e)}")
+        return charts, False
     
-    return charts
\ No newline at end of file
+    return charts, True
@@ -0,0 +1,186 @@
+"""Caching Utilities
+
+Small thread-safe caches shared by the services. ``TieredCache`` puts an
+in-memory LRU in front of an optional JSON-on-disk store; both tiers
+support an optional time-to-live.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def hash_key(*parts):
+    """Build a stable hex digest from bytes/str parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Bounded in-memory LRU cache with hit/miss counters and optional TTL"""
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, expires_at=None):
+        if self.maxsize <= 0:
+            return
+        if expires_at is None and self.ttl:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """JSON file per key, sharded by the first two hex characters"""
+
+    def __init__(self, directory, ttl=None, max_entries=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get_entry(self, key):
+        """Return ``(value, expires_at)`` or None when missing or expired"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            value, expires_at = entry["value"], entry.get("expires_at")
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        self.hits += 1
+        return value, expires_at
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        path = self._path(key)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"value": value, "expires_at": expires_at}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            # The disk tier is best-effort; the memory tier still holds the value
+            return
+
+        self._writes += 1
+        if self.max_entries and self._writes % 64 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones beyond ``max_entries``"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+
+        entries.sort()
+        now = time.time()
+        excess = len(entries) - self.max_entries if self.max_entries else 0
+        for i, (mtime, path) in enumerate(entries):
+            if i < excess or (self.ttl and mtime + self.ttl <= now):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class TieredCache:
+    """Memory LRU backed by an optional disk tier"""
+
+    def __init__(self, maxsize=128, directory=None, ttl=None, max_disk_entries=None):
+        self.memory = LRUCache(maxsize, ttl)
+        self.disk = DiskCache(directory, ttl, max_disk_entries) if directory else None
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.memory.set(key, value, expires_at)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        """Hit/miss counters; a disk hit counts as a memory miss"""
+        disk_hits = self.disk.hits if self.disk else 0
+        misses = self.disk.misses if self.disk else self.memory.misses
+        return {
+            "hits": self.memory.hits + disk_hits,
+            "misses": misses,
+            "memory_hits": self.memory.hits,
+            "disk_hits": disk_hits,
+            "size": len(self.memory),
+        }
@@ -1,31 +1,173 @@
 """Image Processing Utilities"""
-import cv2
+import base64
+import io
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 
-def draw_boxes(image, predictions):
-    """Draw bounding boxes on image"""
-    for pred in predictions:
-        x = int(pred['x'] - pred['width'] / 2)
-        y = int(pred['y'] - pred['height'] / 2)
-        w = int(pred['width'])
-        h = int(pred['height'])
-        
-        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-        
-        label = f"{pred['class']}: {pred['confidence']:.2f}"
-        cv2.putText(image, label, (x, y - 10), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    
-    return image
+from config.settings import BOX_FILL_ALPHA, BOX_REFERENCE_SIDE, BOX_DENSE_LIMIT
+from utils.metrics import timed_stage
+
+# -------------------- Box Rendering --------------------
+
+# Outline colours (RGB); a class always gets the same one
+BOX_PALETTE = [
+    (0, 200, 83),
+    (41, 121, 255),
+    (255, 145, 0),
+    (213, 0, 249),
+    (0, 184, 212),
+    (255, 23, 68),
+    (255, 214, 0),
+    (118, 255, 3),
+]
+
+
+def class_color(class_name):
+    return BOX_PALETTE[zlib.crc32(str(class_name).encode("utf-8")) % len(BOX_PALETTE)]
+
+
+def _box_corners(predictions, width, height):
+    """``(n, 4)`` int array of x0, y0, x1, y1 clipped to the image"""
+    boxes = np.array(
+        [(p['x'], p['y'], p['width'], p['height']) for p in predictions], dtype=np.float64
+    ).reshape(-1, 4)
+    half_w, half_h = boxes[:, 2] / 2, boxes[:, 3] / 2
+    corners = np.stack([
+        boxes[:, 0] - half_w, boxes[:, 1] - half_h,
+        boxes[:, 0] + half_w, boxes[:, 1] + half_h,
+    ], axis=1)
+    corners = np.rint(corners).astype(np.int64)
+    np.clip(corners[:, 0::2], 0, width - 1, out=corners[:, 0::2])
+    np.clip(corners[:, 1::2], 0, height - 1, out=corners[:, 1::2])
+    return corners
+
+
+def draw_boxes(canvas, predictions, fill_alpha=BOX_FILL_ALPHA, show_labels=True):
+    """Draw boxes and labels onto an RGB ``uint8`` array in place.
+
+    Line width and text size grow with the image so boxes stay legible
+    on high-resolution scans; ``fill_alpha`` > 0 shades each box with its
+    class colour. Past ``BOX_DENSE_LIMIT`` boxes only outlines are drawn.
+    """
+    import cv2
+
+    if not predictions:
+        return canvas
+
+    height, width = canvas.shape[:2]
+    scale = max(1.0, max(width, height) / BOX_REFERENCE_SIDE)
+    thickness = max(2, round(2 * scale))
+    font_scale = 0.5 * scale
+    label_offset = round(10 * scale)
+
+    corners = _box_corners(predictions, width, height)
+    colors = [class_color(p['class']) for p in predictions]
+    if len(predictions) > BOX_DENSE_LIMIT:
+        fill_alpha, show_labels = 0, False
+
+    if fill_alpha > 0:
+        # Fill every box on a scratch copy of the covered area, then blend it
+        # back once: cost no longer grows with box count x box area
+        ux0, uy0 = corners[:, :2].min(axis=0)
+        ux1, uy1 = corners[:, 2:].max(axis=0)
+        region = canvas[uy0:uy1 + 1, ux0:ux1 + 1]
+        overlay = region.copy()
+        for (x0, y0, x1, y1), color in zip((corners - (ux0, uy0, ux0, uy0)).tolist(), colors):
+            cv2.rectangle(overlay, (x0, y0), (x1, y1), color, cv2.FILLED)
+        cv2.addWeighted(overlay, fill_alpha, region, 1.0 - fill_alpha, 0, dst=region)
+
+    for (x0, y0, x1, y1), color, pred in zip(corners.tolist(), colors, predictions):
+        cv2.rectangle(canvas, (x0, y0), (x1, y1), color, thickness)
+        if show_labels:
+            label = f"{pred['class']}: {pred['confidence']:.2f}"
+            cv2.putText(canvas, label, (x0, max(y0 - label_offset, 0)),
+                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+
+    return canvas
 
+
+@timed_stage("boxes")
 def process_detection_image(uploaded_image, predictions):
-    """Process uploaded image with detection boxes"""
+    """Annotated RGB copy of the upload, drawn on a single buffer"""
+    rgb_image = uploaded_image if uploaded_image.mode == "RGB" else uploaded_image.convert("RGB")
+    canvas = np.array(rgb_image)
+    draw_boxes(canvas, predictions)
+    # Pillow keeps RGB padded to 4 bytes per pixel, so moving in and out of
+    # numpy is the only copying left; drawing itself happens in place
+    return Image.fromarray(canvas)
+
+
+def encode_jpeg(image, quality=75):
+    """Encode a PIL image to JPEG bytes in memory"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def encode_image_base64(image, quality=75):
+    """Encode a PIL image once as a base64 JPEG string for API upload"""
+    return base64.b64encode(encode_jpeg(image, quality)).decode("ascii")
+
+
+@contextmanager
+def temporary_image_file(image, quality=75):
+    """Write the image to a temp JPEG that is removed on exit"""
+    fd, path = tempfile.mkstemp(suffix=".jpg")
     try:
-        img_array = np.array(uploaded_image)
-        img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        processed_img_bgr = draw_boxes(img_bgr.copy(), predictions)
-        processed_img_rgb = cv2.cvtColor(processed_img_bgr, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(processed_img_rgb)
-    except:
-        return uploaded_image.copy()
\ No newline at end of file
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_jpeg(image, quality))
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def load_image(source):
+    """Open an upload with EXIF orientation applied, as RGB"""
+    image = ImageOps.exif_transpose(Image.open(source))
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def prepare_upload_image(image, max_side=1280):
+    """RGB copy shrunk to ``max_side`` plus the ``(x, y)`` scale back to ``image``"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    longest = max(image.size)
+    if not max_side or longest <= max_side:
+        return image, (1.0, 1.0)
+
+    ratio = max_side / longest
+    new_size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+    resized = image.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+    return resized, (image.width / resized.width, image.height / resized.height)
+
+
+def scale_predictions(predictions, scale):
+    """Map prediction boxes from a resized image back to the original"""
+    scale_x, scale_y = scale
+    if scale_x == scale_y == 1.0:
+        return predictions
+
+    scaled = []
+    for pred in predictions:
+        pred = dict(pred)
+        for key, factor in (("x", scale_x), ("y", scale_y), ("width", scale_x), ("height", scale_y)):
+            if key in pred:
+                pred[key] = pred[key] * factor
+        if "points" in pred:
+            pred["points"] = [
+                {**point, "x": point["x"] * scale_x, "y": point["y"] * scale_y}
+                for point in pred["points"]
+            ]
+        scaled.append(pred)
+    return scaled
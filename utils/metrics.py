@@ -0,0 +1,210 @@
+"""Latency Metrics
+
+Per-stage latency histograms and error counters for the slow steps of a
+scan (detection backend, Gemini, parsing, box drawing, chat, PDF). Stages
+are timed with ``span`` or the ``timed_stage`` decorator and exported as a
+snapshot (admin panel) or Prometheus text (``/metrics``).
+
+With ``METRICS_ENABLED=0`` ``timed_stage`` returns the function unchanged and
+``span`` hands back a shared no-op context manager.
+"""
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import METRICS_ENABLED, METRICS_BUCKETS, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NOOP_SPAN = nullcontext()
+
+
+class Histogram:
+    """Cumulative-style latency histogram with fixed upper bounds (seconds)"""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding rank ``q``"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class MetricsRegistry:
+    """Histograms and error counters keyed by stage name"""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=None):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if error is not None:
+                self._errors[(stage, error)] = self._errors.get((stage, error), 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+
+    def snapshot(self):
+        """Per-stage count, mean/p50/p95/p99/max (seconds) and errors by code"""
+        with self._lock:
+            stages = {}
+            for stage, h in sorted(self._histograms.items()):
+                stages[stage] = {
+                    'count': h.count,
+                    'mean': h.sum / h.count if h.count else 0.0,
+                    'p50': h.quantile(0.50),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                    'max': h.max,
+                    'errors': {code: n for (s, code), n in self._errors.items() if s == stage},
+                }
+            return stages
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP ent_stage_duration_seconds Latency of each processing stage.",
+            "# TYPE ent_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f'ent_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'ent_stage_duration_seconds_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'ent_stage_duration_seconds_count{{stage="{stage}"}} {h.count}')
+
+            lines.append("# HELP ent_stage_errors_total Failed stage calls by error code.")
+            lines.append("# TYPE ent_stage_errors_total counter")
+            for (stage, code), n in sorted(self._errors.items()):
+                lines.append(f'ent_stage_errors_total{{stage="{stage}",code="{code}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _error_code(exc):
+    return getattr(exc, "code", None) or type(exc).__name__
+
+
+class _Span:
+    """One timed observation; a class rather than @contextmanager to keep it cheap"""
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A consumer closing a streaming stage early is not a failure
+        error = None if exc is None or exc_type is GeneratorExit else _error_code(exc)
+        registry.observe(self.stage, time.perf_counter() - self.started, error)
+        return False
+
+
+def span(stage):
+    """Time the enclosed block as one observation of ``stage``"""
+    return _Span(stage) if METRICS_ENABLED else _NOOP_SPAN
+
+
+def timed_stage(stage):
+    """Decorator form of ``span`` (leaves the function untouched when disabled)"""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def metrics_snapshot():
+    return registry.snapshot()
+
+
+def prometheus_text():
+    return registry.prometheus_text()
+
+
+# ---- Standalone Exporter ----
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve ``/metrics`` from a daemon thread (once per process; 0 disables)"""
+    global _server
+    if not (METRICS_ENABLED and port):
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                # Another process (e.g. a second Streamlit worker) already serves this port
+                logger.warning("Metrics exporter not started on port %s: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return _server
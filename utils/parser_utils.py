@@ -1,11 +1,15 @@
 """Response Parsing Utilities"""
 import re
 import json
-import streamlit as st
+import logging
 
-def parse_gemini_response(response_text):
-    """Parse Gemini response into structured sections"""
-    sections = {
+from utils.metrics import timed_stage
+
+logger = logging.getLogger(__name__)
+
+
+def _empty_sections():
+    return {
         'overview': '',
         'severity': '',
         'visual_reasoning': '',
@@ -17,54 +21,229 @@ def parse_gemini_response(response_text):
         'chart_data': {}
     }
 
+
+def _section_for_line(l):
+    """Return the section a header line starts, or None"""
+    if "SECTION 1" in l or "OVERVIEW" in l:
+        return "overview"
+    elif "SECTION 2" in l or "SEVERITY" in l:
+        return "severity"
+    elif "SECTION 3" in l or "VISUAL REASONING" in l:
+        return "visual_reasoning"
+    elif "SECTION 4" in l or "TIMELINE" in l:
+        return "timeline"
+    elif "SECTION 5" in l or "SYMPTOMS" in l:
+        return "symptoms"
+    elif "SECTION 6" in l or "PREVENTION" in l:
+        return "prevention"
+    elif "SECTION 7" in l or "RED-FLAG" in l or "ALERTS" in l:
+        return "red_flags"
+    elif "SECTION 8" in l or "DISCLAIMER" in l:
+        return "disclaimer"
+    return None
+
+
+def _append_section_line(sections, current_section, l):
+    if current_section in ["symptoms", "prevention", "red_flags"]:
+        if l.startswith("-") or l.startswith("•") or l.startswith("*"):
+            sections[current_section].append(l.lstrip("-•* ").strip())
+    else:
+        sections[current_section] += l + " "
+
+
+@timed_stage("parse")
+def parse_gemini_response(response_text):
+    """Parse Gemini response into structured sections.
+
+    Same rules as the streamed path: the chart JSON ends at its matching
+    closing brace, so braces in later prose do not break it.
+    """
+    parser = IncrementalAnalysisParser()
+    if response_text:
+        parser.feed(response_text)
+        parser.finish()
+    return parser.sections
+
+
+# -------------------- Structured (JSON) Responses --------------------
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+
+def validate_schema(value, schema, path="$"):
+    """Return a list of schema violations (types and required keys only)"""
+    expected = _JSON_TYPES.get(schema.get("type"))
+    if expected and (not isinstance(value, expected) or
+                     (isinstance(value, bool) and schema.get("type") != "boolean")):
+        return [f"{path}: expected {schema['type']}"]
+
+    errors = []
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], sub_schema, f"{path}.{key}"))
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def _labeled_values_to_dict(series):
+    """[{"label": "Day 1", "value": 2.5}, ...] -> {"Day 1": 2.5, ...}"""
+    if isinstance(series, dict):
+        return series
+    return {item["label"]: item["value"] for item in series}
+
+
+@timed_stage("parse")
+def parse_structured_response(response_text, schema):
+    """Parse a JSON-mode Gemini response in one pass.
+
+    Returns the same section dict as ``parse_gemini_response``, or None
+    when the text is not valid JSON or does not match ``schema``.
+    """
     if not response_text:
-        return sections
+        return None
+
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
 
-    # Extract JSON
     try:
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            json_text = json_match.group()
-            sections['chart_data'] = json.loads(json_text)
-    except Exception as e:
-        st.warning(f"Could not parse chart data: {str(e)}")
-
-    # Parse text sections
-    lines = response_text.split("\n")
-    current_section = None
-
-    for line in lines:
-        l = line.strip()
-        
-        if "SECTION 1" in l or "OVERVIEW" in l:
-            current_section = "overview"
-        elif "SECTION 2" in l or "SEVERITY" in l:
-            current_section = "severity"
-        elif "SECTION 3" in l or "VISUAL REASONING" in l:
-            current_section = "visual_reasoning"
-        elif "SECTION 4" in l or "TIMELINE" in l:
-            current_section = "timeline"
-        elif "SECTION 5" in l or "SYMPTOMS" in l:
-            current_section = "symptoms"
-        elif "SECTION 6" in l or "PREVENTION" in l:
-            current_section = "prevention"
-        elif "SECTION 7" in l or "RED-FLAG" in l or "ALERTS" in l:
-            current_section = "red_flags"
-        elif "SECTION 8" in l or "DISCLAIMER" in l:
-            current_section = "disclaimer"
-        elif current_section and l and not l.startswith("{"):
-            if current_section in ["symptoms", "prevention", "red_flags"]:
-                if l.startswith("-") or l.startswith("•") or l.startswith("*"):
-                    sections[current_section].append(l.lstrip("-•* ").strip())
-            else:
-                sections[current_section] += l + " "
+        data = json.loads(text)
+    except ValueError:
+        return None
+
+    if validate_schema(data, schema):
+        return None
+
+    sections = _empty_sections()
+    for key in sections:
+        if key != 'chart_data':
+            sections[key] = data[key]
+
+    chart_data = dict(data['chart_data'])
+    for key in ('symptom_probability_distribution', 'infection_progress_timeline',
+                'visual_feature_contribution', 'prevention_effectiveness'):
+        chart_data[key] = _labeled_values_to_dict(chart_data[key])
+    sections['chart_data'] = chart_data
 
     return sections
 
-def format_doctor_reply(text):
-    if not text:
-        return ""
 
+def _brace_delta(line):
+    """Net change in JSON nesting depth for one line, ignoring braces in strings"""
+    depth = 0
+    in_string = escaped = False
+    for ch in line:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = in_string
+        elif ch == '"':
+            in_string = not in_string
+        elif not in_string:
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+    return depth
+
+
+class IncrementalAnalysisParser:
+    """Parse a streamed Gemini analysis as chunks arrive.
+
+    ``feed`` returns the names of sections that became complete: a text
+    section completes when the next header (or the chart JSON) begins,
+    and ``chart_data`` completes when its closing brace arrives. Only
+    whole lines are parsed; ``finish`` flushes whatever is left.
+    """
+
+    def __init__(self):
+        self.sections = _empty_sections()
+        self._buffer = ""
+        self._current = None
+        self._json_lines = None
+        self._json_depth = 0
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        for line in lines:
+            completed.extend(self._process_line(line))
+        return completed
+
+    def finish(self):
+        completed = []
+        if self._buffer:
+            completed.extend(self._process_line(self._buffer))
+            self._buffer = ""
+        if self._json_lines is not None:
+            completed.extend(self._close_json())
+        if self._current:
+            completed.append(self._current)
+            self._current = None
+        return completed
+
+    def _close_section(self):
+        if not self._current:
+            return []
+        done, self._current = self._current, None
+        return [done]
+
+    def _close_json(self):
+        json_text, self._json_lines = "\n".join(self._json_lines), None
+        try:
+            self.sections['chart_data'] = json.loads(json_text)
+        except Exception as e:
+            logger.warning("Could not parse chart data: %s", e)
+            return []
+        return ['chart_data']
+
+    def _process_line(self, line):
+        l = line.strip()
+
+        if self._json_lines is not None:
+            self._json_lines.append(l)
+            self._json_depth += _brace_delta(l)
+            return self._close_json() if self._json_depth <= 0 else []
+
+        if l.startswith("```"):
+            return []
+
+        if l.startswith("{"):
+            completed = self._close_section()
+            self._json_lines = [l]
+            self._json_depth = _brace_delta(l)
+            if self._json_depth <= 0:
+                completed.extend(self._close_json())
+            return completed
+
+        section = _section_for_line(l)
+        if section:
+            completed = self._close_section() if section != self._current else []
+            self._current = section
+            return completed
+
+        if self._current and l:
+            _append_section_line(self.sections, self._current, l)
+        return []
+
+
+def _doctor_sentences(text):
+    """Split a reply into sentences, keeping decimals like 91.7% intact"""
     # Normalize whitespace
     text = text.strip().replace("\n", " ")
 
@@ -72,15 +251,47 @@ def format_doctor_reply(text):
     text = re.sub(r'(\d)\.(\d)', r'\1<dot>\2', text)
 
     # Split into sentences safely
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    return [s.replace("<dot>", ".").strip() for s in re.split(r'(?<=[.!?])\s+', text)]
+
+
+def format_doctor_reply(text, max_sentences=4):
+    if not text:
+        return ""
 
-    clean_sentences = []
-    for s in sentences:
-        s = s.replace("<dot>", ".").strip()
-        if len(s) > 12:
-            clean_sentences.append(s)
+    clean_sentences = [s for s in _doctor_sentences(text) if len(s) > 12]
 
     # Enforce max 4 sentences
-    clean_sentences = clean_sentences[:4]
+    clean_sentences = clean_sentences[:max_sentences]
+
+    return "\n".join(clean_sentences)
+
+
+class DoctorReplyStream:
+    """Accumulate a streamed reply and count its finished sentences.
+
+    A sentence counts as finished only once whitespace follows its
+    terminator, so a trailing "91." is not closed until the next token
+    shows whether it is a decimal. Fragments of 12 characters or fewer are
+    ignored, as in ``format_doctor_reply``.
+    """
+
+    def __init__(self, max_sentences=4):
+        self.max_sentences = max_sentences
+        self.text = ""
+
+    def feed(self, token):
+        """Add a token; returns True once ``max_sentences`` are complete"""
+        self.text += token
+        return self.complete_sentences() >= self.max_sentences
+
+    def complete_sentences(self):
+        if not self.text.strip():
+            return 0
+        sentences = _doctor_sentences(self.text)
+        if not (self.text[-1].isspace() and sentences[-1][-1:] in ".!?"):
+            # Last piece may still be growing
+            sentences = sentences[:-1]
+        return sum(1 for s in sentences if len(s) > 12)
 
-    return "\n".join(clean_sentences)
\ No newline at end of file
+    def reply(self):
+        return format_doctor_reply(self.text, self.max_sentences)
@@ -5,8 +5,14 @@ def initialize_session_state():
     """Initialize all session state variables"""
     defaults = {
         "uploaded_image": None,
+        "uploaded_images": [],
+        "uploaded_file_ids": [],
+        "uploaded_image_keys": [],
+        "batch_results": [],
         "predictions": [],
         "processed_image": None,
+        "processed_images": {},
+        "primary_index": 0,
         "detected_classes": [],
         "analysis": {},
         "chart_data": {},
@@ -14,8 +20,11 @@ def initialize_session_state():
         "report_generated": False,
         "report_data": None,
         "pdf_buffer": None,
+        "report_job": None,
+        "report_stamp": None,
         "patient_age": None,
         "medical_context": {},
+        "pipeline": None,
         "chatbot": None,
         "chat_history": [],
         "pending_user_message": None